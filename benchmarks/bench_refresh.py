@@ -0,0 +1,191 @@
+"""Drive the shared fetcher and zone coordinators end to end against the fake API.
+
+Run from the repository root with Home Assistant installed (``pip install
+homeassistant``); no real API token or network access is used. Example::
+
+    python -m benchmarks.bench_refresh --scales 1,10,100 --zones 1,10,50 --json run.json
+
+Each scenario does a cold refresh (full site + price download) followed by
+``--rounds`` delta refreshes after the fake API moves a share of its prices.
+Reported per refresh: fetch, parse, price merge (raw data processing), snapshot
+build and per-zone filter times, peak Python memory (tracemalloc) and the number
+of entity state writes the zone diffs would cause.
+"""
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from types import SimpleNamespace
+
+from homeassistant.core import HomeAssistant
+from homeassistant.util import dt as dt_util
+
+from benchmarks.fake_api import CENTRES, FakeFpdApi, start_server
+from custom_components.qld_fuel import coordinator as qld_coordinator
+from custom_components.qld_fuel.const import DOMAIN
+
+
+class _ConfigEntries:
+    """Just enough of hass.config_entries for the coordinators' domain option lookups."""
+
+    def __init__(self, entries):
+        self._entries = entries
+
+    def async_entries(self, domain=None):
+        return self._entries
+
+
+def _make_entries(count, rng):
+    entries = []
+    for i in range(count):
+        lat, lng, _, spread = CENTRES[i % len(CENTRES)]
+        entries.append(
+            SimpleNamespace(
+                entry_id=f"bench_{i}",
+                title=f"Bench zone {i}",
+                data={
+                    "subscriber_token": "bench",
+                    "is_master": i == 0,
+                    "latitude": rng.gauss(lat, spread / 2),
+                    "longitude": rng.gauss(lng, spread / 2),
+                    "radius": rng.choice((5, 10, 25, 50)),
+                    "fuel_types": ["12", "5", "3"],
+                    "scan_interval": 6,
+                },
+                options={},
+            )
+        )
+    return entries
+
+
+def _entity_writes(zones):
+    """State writes the sensors would make for the last refresh of every zone."""
+    return sum(
+        len(zone.changed_keys) + len(zone.changed_fuels["global"]) + len(zone.changed_fuels["local"])
+        for zone in zones
+    )
+
+
+async def _run_scenario(base_url, zone_count, rounds, api, seed):
+    rng = random.Random(seed)
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = HomeAssistant(config_dir)
+        dt_util.set_default_time_zone(dt_util.get_time_zone("Australia/Brisbane"))
+        entries = _make_entries(zone_count, rng)
+        hass.config_entries = _ConfigEntries(entries)
+        hass.data[DOMAIN] = {}
+
+        qld_coordinator.API_BASE_URL = base_url
+        fetcher = qld_coordinator.async_get_fetcher(hass)
+        zones = []
+        for entry in entries:
+            zone = qld_coordinator.QldFuelDataUpdateCoordinator(hass, entry, fetcher)
+            hass.data[DOMAIN][entry.entry_id] = zone
+            fetcher.async_add_zone(zone)
+            zones.append(zone)
+
+        results = []
+        try:
+            for refresh in range(rounds + 1):
+                changed = api.advance() if refresh else None
+                tracemalloc.start()
+                started = time.perf_counter()
+                await fetcher.async_refresh_all()
+                elapsed = time.perf_counter() - started
+                _, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+
+                if not fetcher.last_update_success or fetcher.data.stale:
+                    raise RuntimeError(f"Refresh failed: {fetcher.last_exception or fetcher.breaker.last_error}")
+
+                filter_times = [zone.metrics["filter_seconds"] or 0 for zone in zones]
+                results.append(
+                    {
+                        "refresh": "cold" if refresh == 0 else f"delta {refresh}",
+                        "prices_changed": changed,
+                        "total_seconds": round(elapsed, 4),
+                        "fetch_seconds": fetcher.metrics["fetch_seconds"],
+                        "parse_seconds": fetcher.metrics["parse_seconds"],
+                        "merge_seconds": fetcher.metrics["merge_seconds"],
+                        "snapshot_seconds": fetcher.metrics["snapshot_seconds"],
+                        "filter_seconds_median": round(statistics.median(filter_times), 4),
+                        "filter_seconds_max": round(max(filter_times), 4),
+                        "peak_memory_mb": round(peak / 2**20, 2),
+                        "entity_writes": _entity_writes(zones),
+                        "sites_in_zones": sum(zone.metrics["sites_in_zone"] or 0 for zone in zones),
+                    }
+                )
+        finally:
+            await hass.async_stop(force=True)
+
+    return results
+
+
+async def _run(args):
+    report = []
+    for scale in args.scales:
+        api = FakeFpdApi(scale, args.seed, args.change_ratio)
+        runner, base_url = await start_server(api)
+        try:
+            for zone_count in args.zones:
+                results = await _run_scenario(base_url, zone_count, args.rounds, api, args.seed)
+                for row in results:
+                    row.update(scale=scale, zones=zone_count, sites=len(api.sites))
+                    report.append(row)
+                    _print_row(row)
+        finally:
+            await runner.cleanup()
+    return report
+
+
+# (result key, header, width, format)
+_COLUMNS = (
+    ("scale", "scale", 5, ""),
+    ("zones", "zones", 5, ""),
+    ("refresh", "refresh", 8, ""),
+    ("total_seconds", "total s", 8, ".3f"),
+    ("fetch_seconds", "fetch s", 8, ".3f"),
+    ("parse_seconds", "parse s", 8, ".3f"),
+    ("merge_seconds", "merge s", 8, ".3f"),
+    ("snapshot_seconds", "build s", 8, ".3f"),
+    ("filter_seconds_median", "filter s", 8, ".4f"),
+    ("peak_memory_mb", "peak MB", 8, ".1f"),
+    ("entity_writes", "writes", 8, ""),
+)
+_header_printed = False
+
+
+def _print_row(row):
+    global _header_printed
+    if not _header_printed:
+        print(" ".join(f"{header:>{width}}" for _, header, width, _ in _COLUMNS))
+        _header_printed = True
+    print(" ".join(f"{row[key]:>{width}{fmt}}" for key, _, width, fmt in _COLUMNS))
+
+
+def _int_list(value):
+    return [int(v) for v in value.split(",")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scales", type=_int_list, default=[1, 10, 100], help="site count multipliers")
+    parser.add_argument("--zones", type=_int_list, default=[1, 10, 50], help="zone counts to try")
+    parser.add_argument("--rounds", type=int, default=3, help="delta refreshes after the cold one")
+    parser.add_argument("--change-ratio", type=float, default=0.05, help="share of prices changed per round")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", type=Path, help="also write the results here for run-to-run comparison")
+    args = parser.parse_args()
+
+    report = asyncio.run(_run(args))
+    if args.json:
+        args.json.write_text(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
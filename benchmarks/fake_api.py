@@ -0,0 +1,174 @@
+"""Local stand-in for the FPD Direct API serving synthetic QLD sites and prices.
+
+Run on its own with ``python -m benchmarks.fake_api --scale 10`` or start it from
+``bench_refresh.py``. Only the two endpoints the integration calls are served;
+both honour ETag/If-None-Match, and prices honour ``lastUpdateUtc``.
+"""
+import argparse
+import asyncio
+import json
+import random
+from datetime import datetime, timedelta
+
+from aiohttp import web
+
+# Roughly the number of sites the real QLD feed returns
+BASE_SITES = 1700
+
+FUEL_IDS = (2, 3, 4, 5, 8, 12, 14, 19)
+
+# (lat, lng, share of sites, spread in degrees); the remainder is spread statewide
+CENTRES = (
+    (-27.47, 153.02, 0.40, 0.35),  # Brisbane
+    (-28.00, 153.40, 0.10, 0.15),  # Gold Coast
+    (-26.65, 153.07, 0.07, 0.15),  # Sunshine Coast
+    (-27.56, 151.95, 0.04, 0.10),  # Toowoomba
+    (-19.26, 146.80, 0.04, 0.10),  # Townsville
+    (-16.92, 145.77, 0.04, 0.10),  # Cairns
+    (-23.38, 150.50, 0.03, 0.10),  # Rockhampton
+    (-21.14, 149.19, 0.03, 0.10),  # Mackay
+    (-24.87, 152.35, 0.03, 0.10),  # Bundaberg
+)
+STATE_BOUNDS = (-29.0, -10.7, 138.0, 153.5)
+
+TIME_FORMAT = "%Y-%m-%dT%H:%M:%S"
+
+
+class FakeFpdApi:
+    """Synthetic statewide dataset whose prices can be advanced between fetches."""
+
+    def __init__(self, scale=1, seed=1, change_ratio=0.05):
+        self.rng = random.Random(seed)
+        self.change_ratio = change_ratio
+        self.now = datetime(2026, 1, 1)
+        self.sites = [self._make_site(1000 + i) for i in range(int(BASE_SITES * scale))]
+        self.prices = {}
+        for site in self.sites:
+            for fuel_id in self.rng.sample(FUEL_IDS, self.rng.randint(3, 6)):
+                self.prices[(site["S"], fuel_id)] = [self._price(fuel_id), self.now.strftime(TIME_FORMAT)]
+        self.version = 0
+        self._bodies = {}
+
+    def _make_site(self, site_id):
+        roll = self.rng.random()
+        for lat, lng, share, spread in CENTRES:
+            if roll < share:
+                lat, lng = self.rng.gauss(lat, spread), self.rng.gauss(lng, spread)
+                break
+            roll -= share
+        else:
+            min_lat, max_lat, min_lng, max_lng = STATE_BOUNDS
+            lat, lng = self.rng.uniform(min_lat, max_lat), self.rng.uniform(min_lng, max_lng)
+
+        # Extra fields mirror the real payload so parsing cost is realistic
+        return {
+            "S": site_id,
+            "A": f"{self.rng.randint(1, 999)} Example Road",
+            "N": f"Station {site_id}",
+            "B": self.rng.randint(1, 200),
+            "P": str(self.rng.randint(4000, 4899)),
+            "G1": 1,
+            "G2": 1,
+            "G3": 1,
+            "G4": 21,
+            "G5": 0,
+            "Lat": round(lat, 6),
+            "Lng": round(lng, 6),
+            "M": "2025-06-01T00:00:00",
+            "GPI": f"ChIJ{site_id:012d}",
+            "MO": "00:00",
+            "MC": "23:59",
+        }
+
+    def _price(self, fuel_id):
+        base = {4: 1100, 3: 1900, 14: 2000, 8: 2100, 5: 2000, 19: 1800}.get(fuel_id, 1850)
+        return base + self.rng.randint(-150, 150)
+
+    def advance(self, minutes=30):
+        """Move the clock on and change a share of the prices, as a price cycle would."""
+        self.now += timedelta(minutes=minutes)
+        stamp = self.now.strftime(TIME_FORMAT)
+        keys = self.rng.sample(list(self.prices), int(len(self.prices) * self.change_ratio))
+        for key in keys:
+            self.prices[key] = [self._price(key[1]), stamp]
+        self.version += 1
+        self._bodies.clear()
+        return len(keys)
+
+    def sites_body(self):
+        if "sites" not in self._bodies:
+            self._bodies["sites"] = json.dumps({"S": self.sites}).encode()
+        return self._bodies["sites"]
+
+    def prices_body(self, since=None):
+        key = ("prices", since)
+        if key not in self._bodies:
+            rows = [
+                {
+                    "SiteId": site_id,
+                    "FuelId": fuel_id,
+                    "CollectionMethod": "T",
+                    "TransactionDateUtc": stamp,
+                    "Price": price,
+                }
+                for (site_id, fuel_id), (price, stamp) in self.prices.items()
+                if since is None or stamp > since
+            ]
+            self._bodies[key] = json.dumps({"SitePrices": rows}).encode()
+        return self._bodies[key]
+
+    def app(self):
+        app = web.Application()
+        app.router.add_get("/Subscriber/GetFullSiteDetails", self._handle_sites)
+        app.router.add_get("/Price/GetSitesPrices", self._handle_prices)
+        return app
+
+    async def _handle_sites(self, request):
+        # Site details never change in the synthetic feed
+        return self._respond(request, "sites-0", self.sites_body)
+
+    async def _handle_prices(self, request):
+        since = request.query.get("lastUpdateUtc")
+        return self._respond(request, f"prices-{self.version}-{since}", lambda: self.prices_body(since))
+
+    def _respond(self, request, etag, body):
+        etag = f'"{etag}"'
+        if request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304, headers={"ETag": etag})
+        return web.Response(body=body(), content_type="application/json", headers={"ETag": etag})
+
+
+async def start_server(api, host="127.0.0.1", port=0):
+    """Serve api in the running loop; returns (runner, base_url)."""
+    runner = web.AppRunner(api.app())
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    bound_port = runner.addresses[0][1]
+    return runner, f"http://{host}:{bound_port}"
+
+
+async def _serve_forever(args):
+    api = FakeFpdApi(args.scale, args.seed)
+    runner, base_url = await start_server(api, args.host, args.port)
+    print(f"Serving {len(api.sites)} sites / {len(api.prices)} prices at {base_url}")
+    try:
+        while True:
+            await asyncio.sleep(args.advance_every)
+            print(f"Advanced prices: {api.advance()} changed")
+    finally:
+        await runner.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scale", type=float, default=1)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--advance-every", type=float, default=60, help="seconds between price changes")
+    asyncio.run(_serve_forever(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,29 +1,270 @@
-from homeassistant.core import HomeAssistant, ServiceCall
+import os
+
+import voluptuous as vol
+
+from homeassistant.core import HomeAssistant, ServiceCall, SupportsResponse
 from homeassistant.config_entries import ConfigEntry
-from .const import DOMAIN, PLATFORMS
-from .coordinator import QldFuelDataUpdateCoordinator
+from homeassistant.exceptions import ServiceValidationError
+from homeassistant.helpers import config_validation as cv
+from homeassistant.util import dt as dt_util
+from .const import DOMAIN, PLATFORMS, FUEL_TYPES_OPTIONS
+from .coordinator import QldFuelDataUpdateCoordinator, async_get_fetcher, async_update_tracked_best
+from .corridor import cheapest_along_route, load_gpx
+from .history_db import RETENTION_DAYS, percentile_rank, percentiles
+from .ranking import query_cheapest
 from .sensor import _RESERVED_DOMAIN_KEYS
 
+FIND_CHEAPEST_SCHEMA = vol.Schema(
+    {
+        vol.Required("fuel_type"): cv.string,
+        vol.Inclusive("latitude", "coordinates"): cv.latitude,
+        vol.Inclusive("longitude", "coordinates"): cv.longitude,
+        vol.Optional("radius", default=10): vol.All(vol.Coerce(float), vol.Range(min=0.1, max=2000)),
+        vol.Optional("limit", default=5): vol.All(vol.Coerce(int), vol.Range(min=1, max=100)),
+        vol.Optional("distance_weight", default=0): vol.All(vol.Coerce(float), vol.Range(min=0)),
+    }
+)
+
+
+def _route_point(value):
+    """Accept [lat, lng], "lat, lng" or {"latitude": .., "longitude": ..}."""
+    if isinstance(value, dict):
+        value = (value.get("latitude"), value.get("longitude"))
+    elif isinstance(value, str):
+        value = value.split(",")
+    if not isinstance(value, (list, tuple)) or len(value) != 2:
+        raise vol.Invalid(f"Expected a [latitude, longitude] pair, got {value!r}")
+    return cv.latitude(value[0]), cv.longitude(value[1])
+
+
+FIND_ALONG_ROUTE_SCHEMA = vol.Schema(
+    {
+        vol.Required("fuel_type"): cv.string,
+        vol.Exclusive("route", "path"): vol.All(cv.ensure_list, [_route_point], vol.Length(min=2)),
+        vol.Exclusive("gpx_path", "path"): cv.string,
+        vol.Optional("buffer", default=2): vol.All(vol.Coerce(float), vol.Range(min=0.1, max=50)),
+        vol.Optional("limit", default=5): vol.All(vol.Coerce(int), vol.Range(min=1, max=100)),
+        vol.Optional("distance_weight", default=0): vol.All(vol.Coerce(float), vol.Range(min=0)),
+    }
+)
+
+
+PRICE_STATISTICS_SCHEMA = vol.Schema(
+    {
+        vol.Required("fuel_type"): cv.string,
+        vol.Optional("days", default=30): vol.All(vol.Coerce(int), vol.Range(min=1, max=RETENTION_DAYS)),
+        vol.Optional("site_id"): cv.string,
+    }
+)
+
+
+def _resolve_fuel(value):
+    """Return (fuel_id, label) for a fuel id ("12") or label ("E10")."""
+    for option in FUEL_TYPES_OPTIONS:
+        if value == option["value"] or value.casefold() == option["label"].casefold():
+            return option["value"], option["label"]
+    raise ServiceValidationError(f"Unknown fuel type: {value}")
+
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Set up QLD Fuel from a config entry."""
     hass.data.setdefault(DOMAIN, {})
-    coordinator = QldFuelDataUpdateCoordinator(hass, entry)
+    fetcher = async_get_fetcher(hass)
+    coordinator = QldFuelDataUpdateCoordinator(hass, entry, fetcher)
 
-    await coordinator.async_config_entry_first_refresh()
+    if await coordinator.async_load_cached_snapshot():
+        if fetcher.data.stale:
+            # Debounced, so zones set up together share one background fetch
+            entry.async_create_background_task(
+                hass, fetcher.async_request_refresh(), f"{DOMAIN}_{entry.entry_id}_refresh"
+            )
+    else:
+        await coordinator.async_config_entry_first_refresh()
     hass.data[DOMAIN][entry.entry_id] = coordinator
+    entry.async_on_unload(fetcher.async_add_zone(coordinator))
+    async_update_tracked_best(hass)
 
     if entry.data.get("is_master") or "master_entry_id" not in hass.data[DOMAIN]:
         hass.data[DOMAIN]["master_entry_id"] = entry.entry_id
 
     if not hass.services.has_service(DOMAIN, "refresh_prices"):
         async def handle_manual_refresh(call: ServiceCall):
-            for coord in hass.data[DOMAIN].values():
-                if isinstance(coord, QldFuelDataUpdateCoordinator):
-                    await coord.async_request_refresh()
+            await async_get_fetcher(hass).async_refresh_all()
 
         hass.services.async_register(DOMAIN, "refresh_prices", handle_manual_refresh)
 
+    if not hass.services.has_service(DOMAIN, "find_cheapest"):
+        async def handle_find_cheapest(call: ServiceCall):
+            """Rank statewide stations near any point by price plus an optional per-km penalty."""
+            snapshot = async_get_fetcher(hass).data
+            if snapshot is None:
+                raise ServiceValidationError("No fuel prices have been loaded yet")
+
+            fuel_id, label = _resolve_fuel(call.data["fuel_type"])
+            lat = call.data.get("latitude", hass.config.latitude)
+            lon = call.data.get("longitude", hass.config.longitude)
+            index = snapshot.fuel_indexes.get(fuel_id)
+            results = []
+            if index is not None:
+                results = await hass.async_add_executor_job(
+                    query_cheapest,
+                    index,
+                    lat,
+                    lon,
+                    call.data["radius"],
+                    call.data["limit"],
+                    call.data["distance_weight"],
+                )
+
+            return {
+                "fuel_type": label,
+                "fetched_at": snapshot.fetched_at.isoformat(),
+                "data_stale": snapshot.stale,
+                "stations": [
+                    {
+                        "site_id": site.site_id,
+                        "name": site.name,
+                        "address": f"{site.address or ''} {site.postcode or ''}".strip(),
+                        "price": price,
+                        "distance_km": round(dist, 1),
+                        "score": round(score, 1),
+                        "latitude": site.lat,
+                        "longitude": site.lng,
+                    }
+                    for score, price, dist, site in results
+                ],
+            }
+
+        hass.services.async_register(
+            DOMAIN,
+            "find_cheapest",
+            handle_find_cheapest,
+            schema=FIND_CHEAPEST_SCHEMA,
+            supports_response=SupportsResponse.ONLY,
+        )
+
+    if not hass.services.has_service(DOMAIN, "find_along_route"):
+        async def handle_find_along_route(call: ServiceCall):
+            """Rank statewide stations within a buffer of a route (points or a GPX file)."""
+            snapshot = async_get_fetcher(hass).data
+            if snapshot is None:
+                raise ServiceValidationError("No fuel prices have been loaded yet")
+
+            fuel_id, label = _resolve_fuel(call.data["fuel_type"])
+            if "gpx_path" in call.data:
+                path = call.data["gpx_path"]
+                if not hass.config.is_allowed_path(path):
+                    raise ServiceValidationError(f"Access to {path} is not allowed (see allowlist_external_dirs)")
+                if not await hass.async_add_executor_job(os.path.isfile, path):
+                    raise ServiceValidationError(f"GPX file {path} does not exist")
+                try:
+                    points = await hass.async_add_executor_job(load_gpx, path)
+                except (OSError, ValueError, TypeError) as err:
+                    raise ServiceValidationError(f"Could not read GPX file {path}: {err}") from err
+            elif "route" in call.data:
+                points = call.data["route"]
+            else:
+                raise ServiceValidationError("Provide either route or gpx_path")
+            if len(points) < 2:
+                raise ServiceValidationError("A route needs at least two points")
+
+            length_km, results = await hass.async_add_executor_job(
+                cheapest_along_route,
+                snapshot,
+                points,
+                call.data["buffer"],
+                fuel_id,
+                call.data["limit"],
+                call.data["distance_weight"],
+            )
+
+            return {
+                "fuel_type": label,
+                "fetched_at": snapshot.fetched_at.isoformat(),
+                "data_stale": snapshot.stale,
+                "route_length_km": round(length_km, 1),
+                "stations": [
+                    {
+                        "site_id": site.site_id,
+                        "name": site.name,
+                        "address": f"{site.address or ''} {site.postcode or ''}".strip(),
+                        "price": price,
+                        "off_route_km": round(off, 2),
+                        "route_km": round(along, 1),
+                        "score": round(score, 1),
+                        "latitude": site.lat,
+                        "longitude": site.lng,
+                    }
+                    for score, price, off, along, site in results
+                ],
+            }
+
+        hass.services.async_register(
+            DOMAIN,
+            "find_along_route",
+            handle_find_along_route,
+            schema=FIND_ALONG_ROUTE_SCHEMA,
+            supports_response=SupportsResponse.ONLY,
+        )
+
+    if not hass.services.has_service(DOMAIN, "price_statistics"):
+        async def handle_price_statistics(call: ServiceCall):
+            """Statewide lows and percentiles for a fuel over the last N days, from the local price history."""
+            fetcher = async_get_fetcher(hass)
+            history_db = await fetcher.async_get_history_db()
+            if history_db is None:
+                raise ServiceValidationError("The local price history is unavailable")
+
+            fuel_id, label = _resolve_fuel(call.data["fuel_type"])
+            days = call.data["days"]
+            by_site = await hass.async_add_executor_job(
+                history_db.fuel_stats, fuel_id, days, dt_util.utcnow().timestamp()
+            )
+            recorded_since = await hass.async_add_executor_job(history_db.recorded_since)
+            sites = fetcher.data.sites if fetcher.data else {}
+
+            def station(s_id):
+                low, low_days, avg = by_site[s_id]
+                site = sites.get(s_id)
+                return {
+                    "site_id": s_id,
+                    "name": site.name if site else None,
+                    "low": low,
+                    "days_since_low": low_days,
+                    "average": avg,
+                }
+
+            averages = [avg for _, _, avg in by_site.values()]
+            response = {
+                "fuel_type": label,
+                "days": days,
+                "recorded_since": (
+                    dt_util.utc_from_timestamp(recorded_since).isoformat() if recorded_since else None
+                ),
+                "stations": len(by_site),
+                "low_percentiles": percentiles([low for low, _, _ in by_site.values()]),
+                "average_percentiles": percentiles(averages),
+                "lowest": station(min(by_site, key=lambda s_id: by_site[s_id][0])) if by_site else None,
+            }
+
+            site_id = call.data.get("site_id")
+            if site_id is not None:
+                if site_id not in by_site:
+                    raise ServiceValidationError(f"No {label} history for site {site_id}")
+                response["station"] = {
+                    **station(site_id),
+                    "average_percentile_rank": percentile_rank(averages, by_site[site_id][2]),
+                }
+            return response
+
+        hass.services.async_register(
+            DOMAIN,
+            "price_statistics",
+            handle_price_statistics,
+            schema=PRICE_STATISTICS_SCHEMA,
+            supports_response=SupportsResponse.ONLY,
+        )
+
     await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
 
     entry.async_on_unload(entry.add_update_listener(async_reload_entry))
@@ -37,6 +278,7 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
 
     if unload_ok:
         hass.data[DOMAIN].pop(entry.entry_id, None)
+        async_update_tracked_best(hass)
 
         if hass.data[DOMAIN].get("master_entry_id") == entry.entry_id:
             remaining = [
@@ -53,9 +295,14 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
                         data={**coord.entry.data, "is_master": True},
                     )
             else:
-                hass.data.pop(DOMAIN)
-                if hass.services.has_service(DOMAIN, "refresh_prices"):
-                    hass.services.async_remove(DOMAIN, "refresh_prices")
+                domain_data = hass.data.pop(DOMAIN)
+                for service in ("refresh_prices", "find_cheapest", "find_along_route", "price_statistics"):
+                    if hass.services.has_service(DOMAIN, service):
+                        hass.services.async_remove(DOMAIN, service)
+                if domain_data.get("fetcher") is not None:
+                    await domain_data["fetcher"].async_shutdown()
+                if domain_data.get("history_db") is not None:
+                    await hass.async_add_executor_job(domain_data["history_db"].close)
 
     return unload_ok
 
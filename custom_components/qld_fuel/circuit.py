@@ -0,0 +1,41 @@
+class CircuitBreaker:
+    """Stop calling the API for a while after repeated failed fetches.
+
+    Closed: fetch normally. After `threshold` consecutive failures the circuit
+    opens and fetches are skipped until `cooldown` has passed; the next fetch is
+    a single trial that closes it on success or re-opens it on failure.
+    """
+
+    def __init__(self, threshold, cooldown):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.last_error = None
+
+    @property
+    def is_open(self):
+        return self.opened_at is not None
+
+    def allow(self, now):
+        """Return True if a fetch may be attempted now."""
+        return self.opened_at is None or now - self.opened_at >= self.cooldown
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self.last_error = None
+
+    def record_failure(self, now, err):
+        self.failures += 1
+        self.last_error = str(err)
+        if self.failures >= self.threshold:
+            self.opened_at = now
+
+    def as_dict(self):
+        return {
+            "open": self.is_open,
+            "consecutive_failures": self.failures,
+            "opened_at": self.opened_at.isoformat() if self.opened_at else None,
+            "last_error": self.last_error,
+        }
@@ -4,7 +4,31 @@ from homeassistant.core import callback
 from homeassistant.helpers import selector
 from homeassistant.const import CONF_LATITUDE, CONF_LONGITUDE
 
-from .const import DOMAIN, TOKEN, RADIUS, FUEL_TYPES, FUEL_TYPES_OPTIONS, SCAN_INTERVAL
+from .const import (
+    DOMAIN,
+    TOKEN,
+    RADIUS,
+    FUEL_TYPES,
+    FUEL_TYPES_OPTIONS,
+    SCAN_INTERVAL,
+    SITE_CACHE_HOURS,
+    DEFAULT_SITE_CACHE_HOURS,
+    FULL_RESYNC_HOURS,
+    DEFAULT_FULL_RESYNC_HOURS,
+    HISTORY_SOURCE,
+    HISTORY_SOURCE_LOCAL,
+    HISTORY_SOURCE_OPTIONS,
+    ADAPTIVE_POLLING,
+    API_DAILY_BUDGET,
+    DEFAULT_API_DAILY_BUDGET,
+    MIN_POLL_MINUTES,
+    DEFAULT_MIN_POLL_MINUTES,
+    MAX_STATIONS,
+    DEFAULT_MAX_STATIONS,
+    STATION_ORDER,
+    STATION_ORDER_CHEAPEST,
+    STATION_ORDER_OPTIONS,
+)
 
 
 class QldFuelConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
@@ -136,21 +160,47 @@ class QldFuelOptionsFlowHandler(config_entries.OptionsFlow):
         options = self.config_entry.options
         data = self.config_entry.data
 
+        fields = {
+            vol.Required("zone", default=options.get("zone", data.get("zone", "zone.home"))): selector.EntitySelector(
+                selector.EntitySelectorConfig(domain="zone")
+            ),
+            vol.Required(RADIUS, default=options.get(RADIUS, data.get(RADIUS, 5))): selector.NumberSelector(
+                selector.NumberSelectorConfig(min=1, max=100, step=1, unit_of_measurement="km")
+            ),
+            vol.Required(FUEL_TYPES, default=options.get(FUEL_TYPES, data.get(FUEL_TYPES, ["12", "5", "3"]))): selector.SelectSelector(
+                selector.SelectSelectorConfig(options=FUEL_TYPES_OPTIONS, multiple=True)
+            ),
+            vol.Required(SCAN_INTERVAL, default=options.get(SCAN_INTERVAL, data.get(SCAN_INTERVAL, 6))): selector.NumberSelector(
+                selector.NumberSelectorConfig(min=1, max=24, step=1, unit_of_measurement="hours")
+            ),
+            vol.Required(MAX_STATIONS, default=options.get(MAX_STATIONS, DEFAULT_MAX_STATIONS)): selector.NumberSelector(
+                selector.NumberSelectorConfig(min=0, max=200, step=1, mode=selector.NumberSelectorMode.BOX)
+            ),
+            vol.Required(STATION_ORDER, default=options.get(STATION_ORDER, STATION_ORDER_CHEAPEST)): selector.SelectSelector(
+                selector.SelectSelectorConfig(options=STATION_ORDER_OPTIONS)
+            ),
+        }
+
+        if data.get("is_master"):
+            fields[vol.Required(SITE_CACHE_HOURS, default=options.get(SITE_CACHE_HOURS, DEFAULT_SITE_CACHE_HOURS))] = selector.NumberSelector(
+                selector.NumberSelectorConfig(min=1, max=168, step=1, unit_of_measurement="hours")
+            )
+            fields[vol.Required(FULL_RESYNC_HOURS, default=options.get(FULL_RESYNC_HOURS, DEFAULT_FULL_RESYNC_HOURS))] = selector.NumberSelector(
+                selector.NumberSelectorConfig(min=1, max=168, step=1, unit_of_measurement="hours")
+            )
+            fields[vol.Required(HISTORY_SOURCE, default=options.get(HISTORY_SOURCE, HISTORY_SOURCE_LOCAL))] = selector.SelectSelector(
+                selector.SelectSelectorConfig(options=HISTORY_SOURCE_OPTIONS)
+            )
+            fields[vol.Required(ADAPTIVE_POLLING, default=options.get(ADAPTIVE_POLLING, False))] = selector.BooleanSelector()
+            fields[vol.Required(API_DAILY_BUDGET, default=options.get(API_DAILY_BUDGET, DEFAULT_API_DAILY_BUDGET))] = selector.NumberSelector(
+                selector.NumberSelectorConfig(min=4, max=1440, step=1, mode=selector.NumberSelectorMode.BOX)
+            )
+            fields[vol.Required(MIN_POLL_MINUTES, default=options.get(MIN_POLL_MINUTES, DEFAULT_MIN_POLL_MINUTES))] = selector.NumberSelector(
+                selector.NumberSelectorConfig(min=5, max=240, step=1, unit_of_measurement="minutes")
+            )
+
         return self.async_show_form(
             step_id="init",
             errors=errors,
-            data_schema=vol.Schema({
-                vol.Required("zone", default=options.get("zone", data.get("zone", "zone.home"))): selector.EntitySelector(
-                    selector.EntitySelectorConfig(domain="zone")
-                ),
-                vol.Required(RADIUS, default=options.get(RADIUS, data.get(RADIUS, 5))): selector.NumberSelector(
-                    selector.NumberSelectorConfig(min=1, max=100, step=1, unit_of_measurement="km")
-                ),
-                vol.Required(FUEL_TYPES, default=options.get(FUEL_TYPES, data.get(FUEL_TYPES, ["12", "5", "3"]))): selector.SelectSelector(
-                    selector.SelectSelectorConfig(options=FUEL_TYPES_OPTIONS, multiple=True)
-                ),
-                vol.Required(SCAN_INTERVAL, default=options.get(SCAN_INTERVAL, data.get(SCAN_INTERVAL, 6))): selector.NumberSelector(
-                    selector.NumberSelectorConfig(min=1, max=24, step=1, unit_of_measurement="hours")
-                ),
-            })
-        )
\ No newline at end of file
+            data_schema=vol.Schema(fields),
+        )
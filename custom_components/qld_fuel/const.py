@@ -1,3 +1,5 @@
+from datetime import timedelta
+
 from homeassistant.const import Platform
 
 DOMAIN = "qld_fuel"
@@ -20,4 +22,100 @@ FUEL_TYPES_OPTIONS = [
 
 SCAN_INTERVAL = "scan_interval"
 
+API_BASE_URL = "https://fppdirectapi-prod.fuelpricesqld.com.au"
+API_REGION_QUERY = "countryId=21&geoRegionLevel=3&geoRegionId=1"
+
+# Per-request budget; site details and prices are fetched concurrently
+REQUEST_TIMEOUT = 30
+REQUEST_RETRIES = 2
+
+# Retries back off exponentially (seconds) with full jitter
+RETRY_BACKOFF_BASE = 2
+RETRY_BACKOFF_MAX = 30
+
+# After this many failed fetches in a row, stop calling the API for the cooldown
+# and keep serving the last good prices marked data_stale
+CIRCUIT_BREAKER_THRESHOLD = 3
+CIRCUIT_BREAKER_COOLDOWN = timedelta(minutes=30)
+
+# A failed fetch is retried before the next regular poll, with the same full-jitter
+# backoff starting from this cap; never later than the regular poll would have been
+FETCH_RETRY_BACKOFF_BASE = timedelta(minutes=5)
+FETCH_RETRY_MIN = timedelta(minutes=1)
+
+# Responses are parsed as they stream in, keeping only these fields per record
+STREAM_CHUNK_SIZE = 64 * 1024
+SITE_FIELDS = ("S", "N", "A", "P", "Lat", "Lng")
+PRICE_FIELDS = ("SiteId", "FuelId", "Price", "TransactionDateUtc")
+
+# Station metadata barely changes, so it is cached far longer than prices
+SITE_CACHE_HOURS = "site_cache_hours"
+DEFAULT_SITE_CACHE_HOURS = 24
+SITE_STORE_KEY = f"{DOMAIN}.sites"
+SITE_STORE_VERSION = 1
+# Priced sites missing from the site list refresh it early at most this often; ids still
+# missing afterwards (inactive or out-of-region sites) never trigger another early refresh
+SITE_EARLY_REFRESH_INTERVAL = timedelta(hours=1)
+
+# Last fetched prices, used to create entities immediately on startup
+PRICE_STORE_KEY = f"{DOMAIN}.prices"
+PRICE_STORE_VERSION = 1
+PRICE_STORE_SAVE_DELAY = 10
+
+# Between full resyncs only prices changed since the newest seen transaction are requested
+API_PRICES_SINCE_PARAM = "lastUpdateUtc"
+FULL_RESYNC_HOURS = "full_resync_hours"
+DEFAULT_FULL_RESYNC_HOURS = 24
+
+# Seconds to collect sensors' history requests into one recorder query
+HISTORY_BATCH_DELAY = 1
+
+# Rolling 7/14 day price windows, rebuilt from the recorder only when missing
+WINDOW_STORE_KEY = f"{DOMAIN}.windows"
+WINDOW_STORE_VERSION = 1
+WINDOW_STORE_SAVE_DELAY = 60
+
+# Where price windows come from: the integration's own history database (7/14/30/90 days),
+# or the 7/14 day windows above rebuilt from raw recorder states or hourly long-term statistics
+HISTORY_SOURCE = "history_source"
+HISTORY_SOURCE_LOCAL = "local"
+HISTORY_SOURCE_STATES = "states"
+HISTORY_SOURCE_STATISTICS = "statistics"
+HISTORY_SOURCE_OPTIONS = [
+    {"value": HISTORY_SOURCE_LOCAL, "label": "Local price history (7/14/30/90 days)"},
+    {"value": HISTORY_SOURCE_STATES, "label": "Recorder states"},
+    {"value": HISTORY_SOURCE_STATISTICS, "label": "Long-term statistics"},
+]
+
+# SQLite file in the config's .storage directory holding every recorded price change
+HISTORY_DB_FILE = f"{DOMAIN}_history.db"
+
+# Optional domain-wide polling that follows the observed price-change rate by hour of day,
+# bounded below by MIN_POLL_MINUTES, above by the scan interval, and by a daily request budget
+ADAPTIVE_POLLING = "adaptive_polling"
+API_DAILY_BUDGET = "api_daily_budget"
+DEFAULT_API_DAILY_BUDGET = 96
+MIN_POLL_MINUTES = "min_poll_minutes"
+DEFAULT_MIN_POLL_MINUTES = 15
+SCHEDULER_STORE_KEY = f"{DOMAIN}.scheduler"
+SCHEDULER_STORE_VERSION = 1
+SCHEDULER_STORE_SAVE_DELAY = 60
+
+# Optionally keep only the N cheapest (per fuel) or nearest stations in a zone as entities
+MAX_STATIONS = "max_stations"
+DEFAULT_MAX_STATIONS = 0
+STATION_ORDER = "station_order"
+STATION_ORDER_CHEAPEST = "cheapest"
+STATION_ORDER_NEAREST = "nearest"
+STATION_ORDER_OPTIONS = [
+    {"value": STATION_ORDER_CHEAPEST, "label": "Cheapest"},
+    {"value": STATION_ORDER_NEAREST, "label": "Nearest"},
+]
+# A station already among the cheapest N keeps its place until it ranks below N plus this
+# share of N (at least one), so the capped set doesn't churn on every price cycle
+STATION_CAP_HYSTERESIS = 0.5
+
+# Dispatched with the set of fuel ids whose cheapest tracked station changed
+SIGNAL_TRACKED_BEST_UPDATED = f"{DOMAIN}_tracked_best_updated"
+
 PLATFORMS = [Platform.SENSOR]
\ No newline at end of file
@@ -1,129 +1,1055 @@
 import logging
 import asyncio
+import queue
+import random
+import sqlite3
+import time
 from datetime import timedelta
 
+from urllib.parse import quote
+
+import aiohttp
+
+from homeassistant.components.recorder import history, get_instance
+from homeassistant.components.recorder.statistics import statistics_during_period
+from homeassistant.core import callback
+from homeassistant.helpers import entity_registry as er
 from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.dispatcher import async_dispatcher_send
+from homeassistant.helpers.storage import STORAGE_DIR, Store
 from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
 from homeassistant.util import dt as dt_util
-from homeassistant.util.location import distance
 from homeassistant.const import CONF_LATITUDE, CONF_LONGITUDE
 
-from .const import DOMAIN, TOKEN, RADIUS, SCAN_INTERVAL
+from .const import (
+    DOMAIN,
+    TOKEN,
+    RADIUS,
+    FUEL_TYPES,
+    SCAN_INTERVAL,
+    API_BASE_URL,
+    API_REGION_QUERY,
+    REQUEST_TIMEOUT,
+    REQUEST_RETRIES,
+    RETRY_BACKOFF_BASE,
+    RETRY_BACKOFF_MAX,
+    CIRCUIT_BREAKER_THRESHOLD,
+    CIRCUIT_BREAKER_COOLDOWN,
+    FETCH_RETRY_BACKOFF_BASE,
+    FETCH_RETRY_MIN,
+    SITE_CACHE_HOURS,
+    DEFAULT_SITE_CACHE_HOURS,
+    SITE_EARLY_REFRESH_INTERVAL,
+    SITE_FIELDS,
+    PRICE_FIELDS,
+    STREAM_CHUNK_SIZE,
+    SITE_STORE_KEY,
+    SITE_STORE_VERSION,
+    PRICE_STORE_KEY,
+    PRICE_STORE_VERSION,
+    PRICE_STORE_SAVE_DELAY,
+    API_PRICES_SINCE_PARAM,
+    FULL_RESYNC_HOURS,
+    DEFAULT_FULL_RESYNC_HOURS,
+    HISTORY_BATCH_DELAY,
+    WINDOW_STORE_KEY,
+    WINDOW_STORE_VERSION,
+    WINDOW_STORE_SAVE_DELAY,
+    HISTORY_SOURCE,
+    HISTORY_SOURCE_LOCAL,
+    HISTORY_SOURCE_STATISTICS,
+    HISTORY_DB_FILE,
+    ADAPTIVE_POLLING,
+    API_DAILY_BUDGET,
+    DEFAULT_API_DAILY_BUDGET,
+    MIN_POLL_MINUTES,
+    DEFAULT_MIN_POLL_MINUTES,
+    SCHEDULER_STORE_KEY,
+    SCHEDULER_STORE_VERSION,
+    SCHEDULER_STORE_SAVE_DELAY,
+    MAX_STATIONS,
+    DEFAULT_MAX_STATIONS,
+    STATION_ORDER,
+    STATION_ORDER_NEAREST,
+    STATION_CAP_HYSTERESIS,
+    SIGNAL_TRACKED_BEST_UPDATED,
+)
+from . import numpy_engine
+from .circuit import CircuitBreaker
+from .history_db import PriceHistoryDb
+from .scheduler import AdaptiveScheduler
+from .snapshot import Site, Snapshot, ZoneSite, best_station, build_snapshot, price_key
+from .stats import PriceHistory, WINDOW_DAYS, points_from_states, points_from_statistics
+from .stream import RecordStream, StreamError
 
 _LOGGER = logging.getLogger(__name__)
 
 
-class QldFuelDataUpdateCoordinator(DataUpdateCoordinator):
-    """Manage fetching data; one shared API fetch is cached across all zone instances."""
+def _serialize_prices(price_rows, fetched_at):
+    """Compact price rows for the on-disk snapshot."""
+    return {
+        "fetched_at": fetched_at.isoformat(),
+        "prices": [[s_id, f_id, price] for (s_id, f_id), price in price_rows.items()],
+    }
 
-    def __init__(self, hass, entry):
-        self.entry = entry
 
-        scan_interval = entry.options.get(
-            SCAN_INTERVAL, entry.data.get(SCAN_INTERVAL, 6)
+def _diff_zone(old, new):
+    """Return the (site, fuel) pairs and per-scope best-price fuels that changed between two zone datasets."""
+    full = old is None or old.get("stale") != new.get("stale")
+
+    changed_fuels = {}
+    for scope in ("global", "local"):
+        old_best = old.get(f"{scope}_cheapest", {}) if old else {}
+        new_best = new.get(f"{scope}_cheapest", {})
+        changed_fuels[scope] = {
+            f_id
+            for f_id in old_best.keys() | new_best.keys()
+            if full or old_best.get(f_id) != new_best.get(f_id)
+        }
+
+    # A new statewide best moves every station's difference_to_qld_cheapest for that fuel
+    delta_changed = changed_fuels["global"]
+    old_sites = old.get("sites", {}) if old else {}
+    new_sites = new.get("sites", {})
+    changed = set()
+
+    for s_id, zone_site in new_sites.items():
+        prev = old_sites.get(s_id)
+        for f_id, price in zone_site.prices.items():
+            if full or prev is None or f_id in delta_changed or prev.prices.get(f_id) != price:
+                changed.add((s_id, f_id))
+
+    for s_id, prev in old_sites.items():
+        zone_site = new_sites.get(s_id)
+        site_prices = zone_site.prices if zone_site else {}
+        changed.update((s_id, f_id) for f_id in prev.prices if f_id not in site_prices)
+
+    return changed, changed_fuels
+
+
+@callback
+def async_update_tracked_best(hass):
+    """Recompute the cheapest price per fuel across every zone and notify changed fuels."""
+    domain_data = hass.data.get(DOMAIN)
+    if domain_data is None:
+        return
+
+    tracked_best = {}
+    for coord in domain_data.values():
+        if not isinstance(coord, QldFuelDataUpdateCoordinator) or not coord.data:
+            continue
+        for f_id, local_best in coord.data.get("local_cheapest", {}).items():
+            if local_best.get("price") is None:
+                continue
+            if f_id not in tracked_best or local_best["price"] < tracked_best[f_id]["price"]:
+                tracked_best[f_id] = local_best
+
+    previous = domain_data.get("tracked_best", {})
+    changed = {
+        f_id
+        for f_id in previous.keys() | tracked_best.keys()
+        if _winner(previous.get(f_id)) != _winner(tracked_best.get(f_id))
+    }
+    domain_data["tracked_best"] = tracked_best
+
+    if changed:
+        async_dispatcher_send(hass, SIGNAL_TRACKED_BEST_UPDATED, changed)
+
+
+def _winner(station):
+    return (station["price"], station["site_id"]) if station else None
+
+
+def _select_tracked(zone_sites, fuels, limit, order, previous=frozenset()):
+    """Return the (site, fuel) pairs that get entities, capped to limit stations when set.
+
+    Nearest keeps the closest stations selling any chosen fuel; cheapest keeps the
+    cheapest stations separately for each fuel, preferring pairs in previous while
+    they stay within the hysteresis margin.
+    """
+    if not limit:
+        return {
+            (s_id, f_id) for s_id, zone_site in zone_sites.items() for f_id in zone_site.prices if f_id in fuels
+        }
+
+    if order == STATION_ORDER_NEAREST:
+        nearest = sorted(
+            (zone_site for zone_site in zone_sites.values() if not fuels.isdisjoint(zone_site.prices)),
+            key=lambda zone_site: zone_site.distance,
+        )[:limit]
+        return {
+            (zone_site.site.site_id, f_id) for zone_site in nearest for f_id in zone_site.prices if f_id in fuels
+        }
+
+    keep_within = limit + max(1, int(limit * STATION_CAP_HYSTERESIS))
+    tracked = set()
+    for f_id in fuels:
+        ranked = [
+            s_id
+            for _, _, s_id in sorted(
+                (zone_site.prices[f_id], zone_site.distance, s_id)
+                for s_id, zone_site in zone_sites.items()
+                if f_id in zone_site.prices
+            )
+        ]
+        chosen = [s_id for s_id in ranked[:keep_within] if (s_id, f_id) in previous][:limit]
+        for s_id in ranked:
+            if len(chosen) >= limit:
+                break
+            if s_id not in chosen:
+                chosen.append(s_id)
+        tracked.update((s_id, f_id) for s_id in chosen)
+    return tracked
+
+
+def _parse_chunks(chunks, stream):
+    """Feed queued body chunks to stream until b"" (end of body) or None (abandoned); runs in the executor.
+
+    Returns (records, seconds spent parsing); records is None when abandoned.
+    """
+    parsing = 0.0
+    while True:
+        chunk = chunks.get()
+        if chunk is None:
+            return None, parsing
+        started = time.monotonic()
+        if not chunk:
+            records = stream.close()
+            return records, parsing + time.monotonic() - started
+        stream.feed(chunk)
+        parsing += time.monotonic() - started
+
+
+def _parse_sites(raw_sites):
+    return [Site.from_raw(raw) for raw in raw_sites]
+
+
+def _merge_prices(price_rows, changed, previous):
+    """Upsert API price rows keyed by (site, fuel).
+
+    Returns the newest transaction time seen and how many prices differ from the
+    previous rows. A server returning every price instead of only changes is handled
+    the same way.
+    """
+    newest = None
+    changed_count = 0
+    for p in changed:
+        key = price_key(p.get("SiteId"), p.get("FuelId"))
+        price = p.get("Price")
+        if previous.get(key) != price:
+            changed_count += 1
+        price_rows[key] = price
+        stamp = p.get("TransactionDateUtc")
+        if stamp and (newest is None or stamp > newest):
+            newest = stamp
+    return newest, changed_count
+
+
+def _window_points(stored):
+    """Turn persisted window points {"site_fuel": [[ts, low, mean], ...]} into {(site, fuel): [(ts, price)]}."""
+    points = {}
+    for key, rows in stored.items():
+        try:
+            s_id, f_id = key.rsplit("_", 1)
+            points[price_key(s_id, f_id)] = [(float(ts), float(low)) for ts, low, _ in rows]
+        except (TypeError, ValueError):
+            _LOGGER.debug("Skipping invalid stored window for %s", key)
+    return points
+
+
+def _station_entity_ids(hass):
+    """Return {entity_id: (site_id, fuel_id)} for every station sensor in the entity registry."""
+    registry = er.async_get(hass)
+    entity_ids = {}
+    for entry in hass.config_entries.async_entries(DOMAIN):
+        prefix = f"{DOMAIN}_{entry.entry_id}_"
+        for registry_entry in er.async_entries_for_config_entry(registry, entry.entry_id):
+            unique_id = registry_entry.unique_id
+            if unique_id.startswith(prefix) and "_diagnostic_" not in unique_id:
+                f_id, _, s_id = unique_id[len(prefix):].partition("_")
+                entity_ids[registry_entry.entity_id] = price_key(s_id, f_id)
+    return entity_ids
+
+
+async def _async_recorder_points(hass, entity_ids, start_time):
+    """Return {entity_id: [(ts, low, mean), ...]} since start_time from the recorder, in one query.
+
+    Long-term statistics when that history source is selected, else recorder states.
+    """
+    if get_domain_option(hass, HISTORY_SOURCE, HISTORY_SOURCE_LOCAL) == HISTORY_SOURCE_STATISTICS:
+        rows = await get_instance(hass).async_add_executor_job(
+            statistics_during_period,
+            hass,
+            start_time,
+            None,
+            set(entity_ids),
+            "hour",
+            None,
+            {"min", "mean"},
         )
+        return {entity_id: points_from_statistics(entity_rows) for entity_id, entity_rows in rows.items()}
+
+    state_history = await get_instance(hass).async_add_executor_job(
+        history.get_significant_states, hass, start_time, None, entity_ids
+    )
+    return {
+        entity_id: points_from_states(states, start_time.timestamp())
+        for entity_id, states in state_history.items()
+    }
+
+
+def get_domain_option(hass, key, default):
+    """Read a domain-wide setting from the master entry's options."""
+    entries = hass.config_entries.async_entries(DOMAIN)
+    master = next((e for e in entries if e.data.get("is_master")), entries[0] if entries else None)
+    if master is None:
+        return default
+    return master.options.get(key, master.data.get(key, default))
+
+
+@callback
+def async_get_fetcher(hass):
+    """Return the domain-wide fetch coordinator, creating it on first use."""
+    domain_data = hass.data[DOMAIN]
+    if "fetcher" not in domain_data:
+        domain_data["fetcher"] = QldFuelFetchCoordinator(hass)
+    return domain_data["fetcher"]
+
+
+class QldFuelFetchCoordinator(DataUpdateCoordinator):
+    """Fetch the statewide snapshot once for every zone and fan it out to them.
+
+    Its data is the shared Snapshot. Zones subscribe instead of running their own
+    timers, so the schedule is the shortest zone interval (or the adaptive schedule)
+    and each refresh is one fetch followed by every zone rebuilding in parallel.
+    """
 
+    def __init__(self, hass):
+        # Shared by every entry, so it must not be bound to (and shut down with) whichever one created it
         super().__init__(
             hass,
             _LOGGER,
-            name=f"{DOMAIN}_{entry.title}",
-            update_interval=timedelta(hours=float(scan_interval)),
+            config_entry=None,
+            name=f"{DOMAIN}_fetcher",
+            update_interval=timedelta(hours=6),
         )
+        self._zones = set()
+        self._unsub_fan_out = None
+        self._fan_out_task = None
+        self._lock = asyncio.Lock()
+        self._history_lock = asyncio.Lock()
+        self.breaker = CircuitBreaker(CIRCUIT_BREAKER_THRESHOLD, CIRCUIT_BREAKER_COOLDOWN)
+        # Per-endpoint request counters, latency and bytes, exposed via diagnostics
+        self.endpoint_stats = {}
+        # endpoint -> (url, ETag, Last-Modified) of the last 200 response
+        self._validators = {}
+        # Priced site ids the last early site refresh could not resolve, and when it ran
+        self._missing_site_ids = set()
+        self._early_site_refresh = None
+        # Last fetch's stage timings (seconds) and counters, shown by diagnostic sensors
+        self.metrics = {
+            "fetch_seconds": None,
+            "parse_seconds": None,
+            "merge_seconds": None,
+            "snapshot_seconds": None,
+            "price_rows": None,
+            "bytes_fetched": 0,
+        }
+
+    @callback
+    def async_add_zone(self, zone):
+        """Subscribe a zone; the shared timer only runs while at least one zone is subscribed."""
+        self._zones.add(zone)
+        self.update_interval = self._poll_interval()
+        if self._unsub_fan_out is None:
+            self._unsub_fan_out = self.async_add_listener(self._handle_fetch_update)
+
+        @callback
+        def remove_zone():
+            self._zones.discard(zone)
+            if self._zones:
+                self.update_interval = self._poll_interval()
+            elif self._unsub_fan_out is not None:
+                self._unsub_fan_out()
+                self._unsub_fan_out = None
+
+        return remove_zone
+
+    @callback
+    def _handle_fetch_update(self):
+        self._fan_out_task = self.hass.async_create_task(self._async_fan_out())
+
+    async def _async_fan_out(self):
+        """Rebuild every subscribed zone from the new snapshot concurrently."""
+        await asyncio.gather(*(zone.async_refresh() for zone in list(self._zones)))
+
+    async def async_refresh_all(self):
+        """Fetch now and wait until every zone has been rebuilt from the result."""
+        await self.async_refresh()
+        if self._fan_out_task is not None:
+            await self._fan_out_task
+
+    async def async_get_snapshot(self):
+        """Return the current snapshot, fetching the first one if nothing is loaded yet."""
+        async with self._lock:
+            if self.data is None:
+                await self.async_refresh()
+        if not self.last_update_success:
+            raise UpdateFailed(f"Error communicating with API: {self.last_exception}")
+        return self.data
+
+    async def async_load_cached_snapshot(self):
+        """Seed the snapshot from the last persisted payload so entities exist before the first fetch.
+
+        Returns False when nothing usable is on disk and a blocking first fetch is needed.
+        """
+        async with self._lock:
+            if self.data is not None:
+                return True
+
+            site_cache = await self._async_get_site_cache()
+            stored = await self._price_store().async_load()
+            if site_cache is None or not stored:
+                return False
+
+            price_rows = {price_key(s_id, f_id): price for s_id, f_id, price in stored["prices"]}
+            fetched_at = dt_util.parse_datetime(stored["fetched_at"])
+            self.async_set_updated_data(
+                await self.hass.async_add_executor_job(
+                    build_snapshot, site_cache["sites"], price_rows, fetched_at, True
+                )
+            )
+            _LOGGER.debug("Loaded cached prices from %s", fetched_at)
+            return True
 
     async def _async_update_data(self):
-        """Fetch data from API or use shared cache."""
-        domain_data = self.hass.data[DOMAIN]
+        """Fetch the statewide sites and prices and build the shared snapshot.
+
+        On failure the last good snapshot keeps being served, marked stale.
+        """
+        now = dt_util.utcnow()
+        if not self.breaker.allow(now):
+            return self._serve_stale(
+                f"circuit open after {self.breaker.failures} failed fetches ({self.breaker.last_error})"
+            )
+
+        self.metrics["parse_seconds"] = 0.0
+        requests_before = self._requests_made()
+        try:
+            started = time.monotonic()
+            sites, price_rows, changed_count = await self._fetch_from_api()
+            fetched = time.monotonic()
+            snapshot = await self.hass.async_add_executor_job(build_snapshot, sites, price_rows, now)
+        except Exception as err:
+            self.breaker.record_failure(now, err)
+            if self.breaker.is_open:
+                _LOGGER.warning(
+                    "QLD Fuel API failed %s times in a row, pausing fetches for %s",
+                    self.breaker.failures,
+                    CIRCUIT_BREAKER_COOLDOWN,
+                )
+            scheduler = await self._async_get_scheduler()
+            scheduler.record_requests(now, self._requests_made() - requests_before)
+            return self._serve_stale(err)
 
-        if "fetch_lock" not in domain_data:
-            domain_data["fetch_lock"] = asyncio.Lock()
+        self.breaker.record_success()
+        self.metrics["fetch_seconds"] = round(fetched - started, 3)
+        self.metrics["snapshot_seconds"] = round(time.monotonic() - fetched, 3)
+        self.metrics["parse_seconds"] = round(self.metrics["parse_seconds"], 3)
+        self.metrics["price_rows"] = len(price_rows)
+        self._price_store().async_delay_save(
+            lambda: _serialize_prices(price_rows, now), PRICE_STORE_SAVE_DELAY
+        )
+        await self._async_record_history(snapshot)
+        await self._async_schedule_next_fetch(now, changed_count, self._requests_made() - requests_before)
+        return snapshot
+
+    async def _async_record_history(self, snapshot):
+        """Append this fetch's price changes to the local history database."""
+        history_db = await self.async_get_history_db()
+        if history_db is None:
+            return
+        try:
+            written = await self.hass.async_add_executor_job(
+                history_db.record, snapshot.fetched_at.timestamp(), snapshot.prices
+            )
+        except sqlite3.Error as err:
+            _LOGGER.warning("Could not record price history: %s", err)
+            return
+        _LOGGER.debug("Recorded %s price changes to local history", written)
 
-        async with domain_data["fetch_lock"]:
-            last_fetch = domain_data.get("last_fetch_time")
-            now = dt_util.utcnow()
+    async def async_get_history_db(self):
+        """Return the shared history database, opening it on first use; None if it cannot be opened.
 
-            if last_fetch is None or (now - last_fetch) > timedelta(minutes=5):
-                _LOGGER.debug("Shared cache expired or empty. Fetching fresh data for %s", self.entry.title)
+        A new database is seeded from the persisted 7/14 day windows, and from the
+        recorder for station sensors without one, so statistics carry over.
+        """
+        domain_data = self.hass.data[DOMAIN]
+        async with self._history_lock:
+            if "history_db" not in domain_data:
+                path = self.hass.config.path(STORAGE_DIR, HISTORY_DB_FILE)
                 try:
-                    raw_data = await self._fetch_from_api()
-                    domain_data["raw_data"] = raw_data
-                    domain_data["last_fetch_time"] = now
-                except Exception as err:
-                    raise UpdateFailed(f"Error communicating with API: {err}") from err
-            else:
-                _LOGGER.debug("Using shared cache for %s", self.entry.title)
+                    history_db = await self.hass.async_add_executor_job(PriceHistoryDb, path)
+                    if history_db.is_empty():
+                        await self._async_seed_history(history_db)
+                except (sqlite3.Error, OSError) as err:
+                    _LOGGER.warning("Local price history unavailable, falling back to recorder windows: %s", err)
+                    history_db = None
+                domain_data["history_db"] = history_db
+        return domain_data["history_db"]
+
+    async def _async_seed_history(self, history_db):
+        """Import the persisted windows, then recorder history for pairs they do not cover."""
+        stored = await Store(self.hass, WINDOW_STORE_VERSION, WINDOW_STORE_KEY).async_load() or {}
+        points = _window_points(stored)
+
+        entity_ids = {
+            entity_id: key for entity_id, key in _station_entity_ids(self.hass).items() if key not in points
+        }
+        if entity_ids:
+            start_time = dt_util.utcnow() - timedelta(days=max(WINDOW_DAYS))
+            try:
+                recorded = await _async_recorder_points(self.hass, sorted(entity_ids), start_time)
+            except Exception as err:
+                _LOGGER.warning("Could not seed price history from the recorder: %s", err)
+                recorded = {}
+            for entity_id, entity_points in recorded.items():
+                if entity_points and entity_id in entity_ids:
+                    # Hourly statistics only give a mean for the hour; states have low == mean
+                    points.setdefault(entity_ids[entity_id], []).extend((ts, mean) for ts, _, mean in entity_points)
+
+        imported = await self.hass.async_add_executor_job(history_db.import_points, points)
+        _LOGGER.debug("Seeded price history with %s rows from stored windows and the recorder", imported)
+
+    def _serve_stale(self, err):
+        """Keep the last good snapshot, flagged stale, or fail if there is none.
+
+        Either way the next attempt is pulled forward from the regular poll.
+        """
+        self.update_interval = self._retry_interval(dt_util.utcnow())
+        if self.data is None:
+            raise UpdateFailed(f"Error communicating with API: {err}")
+        _LOGGER.warning("Serving prices from %s: %s", self.data.fetched_at, err)
+        if self.data.stale:
+            return self.data
+        old = self.data
+        return Snapshot(
+            old.fetched_at,
+            True,
+            old.sites,
+            old.site_index,
+            old.prices,
+            old.global_cheapest,
+            old.columns,
+            old.fuel_indexes,
+        )
 
-            raw_data = domain_data["raw_data"]
+    def _poll_interval(self):
+        """The adaptive schedule when enabled, else the shortest scan interval of any zone."""
+        scheduler = self.hass.data[DOMAIN].get("scheduler")
+        if scheduler is not None and scheduler.next_fetch is not None:
+            return max(scheduler.next_fetch - dt_util.utcnow(), timedelta(minutes=1))
+        return self._scan_interval()
 
-        return self._process_raw_data(raw_data)
+    def _scan_interval(self):
+        return min((zone.scan_interval for zone in self._zones), default=timedelta(hours=6))
+
+    def _retry_interval(self, now):
+        """Wait before retrying a failed fetch: full jitter on a cap doubling per failure.
+
+        Never shorter than the breaker's remaining cooldown nor longer than the scan interval.
+        """
+        scan_interval = self._scan_interval()
+        cap = min(FETCH_RETRY_BACKOFF_BASE * 2 ** max(self.breaker.failures - 1, 0), scan_interval)
+        interval = max(timedelta(seconds=random.uniform(0, cap.total_seconds())), FETCH_RETRY_MIN)
+        if self.breaker.is_open:
+            interval = max(interval, self.breaker.opened_at + self.breaker.cooldown - now)
+        return min(interval, scan_interval)
+
+    def _requests_made(self):
+        """HTTP requests sent to the API so far, retries included."""
+        return sum(stats["requests"] for stats in self.endpoint_stats.values())
+
+    async def _async_schedule_next_fetch(self, now, changed_count, requests):
+        """Feed the fetch into the scheduler and pick when the next one is due.
+
+        Change rates are always learned so enabling adaptive polling starts from real data.
+        """
+        scheduler = await self._async_get_scheduler()
+        scheduler.daily_budget = max(int(get_domain_option(self.hass, API_DAILY_BUDGET, DEFAULT_API_DAILY_BUDGET)), 1)
+        scheduler.min_interval = timedelta(
+            minutes=float(get_domain_option(self.hass, MIN_POLL_MINUTES, DEFAULT_MIN_POLL_MINUTES))
+        )
+        scheduler.max_interval = timedelta(hours=float(get_domain_option(self.hass, SCAN_INTERVAL, 6)))
+
+        local_now = dt_util.as_local(now)
+        scheduler.record_fetch(local_now, changed_count, requests)
+        self._scheduler_store().async_delay_save(
+            lambda: {"hourly_rates": scheduler.hourly_rates}, SCHEDULER_STORE_SAVE_DELAY
+        )
+
+        if get_domain_option(self.hass, ADAPTIVE_POLLING, False):
+            interval = scheduler.next_interval(local_now)
+            scheduler.next_fetch = now + interval
+            _LOGGER.debug("%s prices changed; next statewide fetch in %s", changed_count, interval)
+        else:
+            scheduler.next_fetch = None
+        self.update_interval = self._poll_interval()
+
+    async def _async_get_scheduler(self):
+        """Return the shared scheduler, restoring learned change rates on first use."""
+        domain_data = self.hass.data[DOMAIN]
+        if "scheduler" not in domain_data:
+            stored = await self._scheduler_store().async_load() or {}
+            rates = stored.get("hourly_rates")
+            if not isinstance(rates, list) or len(rates) != 24:
+                rates = None
+            domain_data.setdefault(
+                "scheduler",
+                AdaptiveScheduler(
+                    DEFAULT_API_DAILY_BUDGET,
+                    timedelta(minutes=DEFAULT_MIN_POLL_MINUTES),
+                    timedelta(hours=6),
+                    rates,
+                ),
+            )
+        return domain_data["scheduler"]
+
+    def _scheduler_store(self):
+        """Return the shared Store holding the learned hourly change rates."""
+        return self.hass.data[DOMAIN].setdefault(
+            "scheduler_store", Store(self.hass, SCHEDULER_STORE_VERSION, SCHEDULER_STORE_KEY)
+        )
+
+    def _price_store(self):
+        """Return the shared Store holding the last fetched prices."""
+        return self.hass.data[DOMAIN].setdefault(
+            "price_store", Store(self.hass, PRICE_STORE_VERSION, PRICE_STORE_KEY)
+        )
 
     async def _fetch_from_api(self):
         """Perform the actual HTTP requests to the QLD Fuel API."""
-        token = self.entry.data.get(TOKEN)
+        token = get_domain_option(self.hass, TOKEN, None)
         if not token:
             raise UpdateFailed("Subscriber Token is missing.")
 
         headers = {"Authorization": f"FPDAPI SubscriberToken={token}"}
         session = async_get_clientsession(self.hass)
-        base_url = "https://fppdirectapi-prod.fuelpricesqld.com.au"
-
-        async with asyncio.timeout(30):
-            urls = [
-                f"{base_url}/Subscriber/GetFullSiteDetails?countryId=21&geoRegionLevel=3&geoRegionId=1",
-                f"{base_url}/Price/GetSitesPrices?countryId=21&geoRegionLevel=3&geoRegionId=1",
-            ]
-
-            results = []
-            for url in urls:
-                async with session.get(url, headers=headers) as response:
-                    if response.status != 200:
-                        _LOGGER.error("QLD Fuel API returned status %s", response.status)
-                        raise UpdateFailed(f"API Error {response.status}")
-                    results.append(await response.json())
-
-            return {
-                "sites": results[0].get("S", []),
-                "prices": results[1].get("SitePrices", []),
-            }
-
-    def _process_raw_data(self, raw_data):
-        """Transform raw JSON into the structured dict used by sensors."""
-        raw_sites = raw_data.get("sites", [])
-        raw_prices = raw_data.get("prices", [])
-
-        site_lookup = {str(s["S"]): s for s in raw_sites}
-        price_map = {}
-        global_cheapest = {}
-
-        for p in raw_prices:
-            price_raw = p.get("Price")
-            if price_raw is None or not (1 < price_raw < 9990):
+
+        site_cache = await self._async_get_site_cache()
+        now = dt_util.utcnow()
+        ttl = timedelta(hours=float(get_domain_option(self.hass, SITE_CACHE_HOURS, DEFAULT_SITE_CACHE_HOURS)))
+
+        if site_cache is None or (now - site_cache["fetched_at"]) > ttl:
+            raw_sites, (prices, changed_count) = await asyncio.gather(
+                self._fetch_sites(session, headers, site_cache is not None),
+                self._fetch_prices(session, headers, now),
+            )
+            site_cache = await self._async_store_site_cache(raw_sites, now)
+        else:
+            prices, changed_count = await self._fetch_prices(session, headers, now)
+
+        known_ids = {site.site_id for site in site_cache["sites"]}
+        new_ids = {s_id for s_id, _ in prices} - known_ids - self._missing_site_ids
+        if (
+            new_ids
+            and site_cache["fetched_at"] != now
+            and (self._early_site_refresh is None or now - self._early_site_refresh >= SITE_EARLY_REFRESH_INTERVAL)
+        ):
+            _LOGGER.debug("%s priced sites missing from site cache, refreshing site details", len(new_ids))
+            raw_sites = await self._fetch_sites(session, headers, True)
+            site_cache = await self._async_store_site_cache(raw_sites, now)
+            self._early_site_refresh = now
+            known_ids = {site.site_id for site in site_cache["sites"]}
+            self._missing_site_ids = {s_id for s_id, _ in prices} - known_ids
+
+        return site_cache["sites"], prices, changed_count
+
+    async def _fetch_prices(self, session, headers, now):
+        """Fetch prices, only asking for changes since the last fetch between full resyncs."""
+        domain_data = self.hass.data[DOMAIN]
+        price_rows = domain_data.get("price_rows")
+        last_full_sync = domain_data.get("last_full_sync")
+        resync = timedelta(hours=float(get_domain_option(self.hass, FULL_RESYNC_HOURS, DEFAULT_FULL_RESYNC_HOURS)))
+        url = f"{API_BASE_URL}/Price/GetSitesPrices?{API_REGION_QUERY}"
+
+        previous = price_rows
+        if price_rows is None or last_full_sync is None or (now - last_full_sync) > resync:
+            changed = await self._fetch_records(
+                session, url, headers, "SitePrices", PRICE_FIELDS, conditional=price_rows is not None
+            )
+            # A 304 means the full list is unchanged, so the current rows are still complete
+            price_rows = {} if changed is not None else dict(price_rows)
+            domain_data["last_full_sync"] = now
+            since = None
+        else:
+            # Merge into a copy; the pending disk save may still be reading the current rows
+            price_rows = dict(price_rows)
+            since = domain_data["prices_since"]
+            changed = await self._fetch_records(
+                session, f"{url}&{API_PRICES_SINCE_PARAM}={quote(since)}", headers, "SitePrices", PRICE_FIELDS
+            )
+        changed = changed or []
+
+        started = time.monotonic()
+        newest, changed_count = await self.hass.async_add_executor_job(
+            _merge_prices, price_rows, changed, previous or {}
+        )
+        self.metrics["merge_seconds"] = round(time.monotonic() - started, 3)
+        domain_data["price_rows"] = price_rows
+        domain_data["prices_since"] = max(filter(None, (newest, since)), default=now.strftime("%Y-%m-%dT%H:%M:%S"))
+
+        _LOGGER.debug(
+            "%s %s price rows (%s tracked)",
+            "Applied" if since else "Resynced",
+            len(changed),
+            len(price_rows),
+        )
+        return price_rows, changed_count
+
+    async def _fetch_sites(self, session, headers, conditional):
+        """Fetch the full statewide site list; None if unchanged since the last fetch (conditional only)."""
+        return await self._fetch_records(
+            session,
+            f"{API_BASE_URL}/Subscriber/GetFullSiteDetails?{API_REGION_QUERY}",
+            headers,
+            "S",
+            SITE_FIELDS,
+            conditional=conditional,
+        )
+
+    async def _async_get_site_cache(self):
+        """Return the cached site metadata, loading it from disk on first use."""
+        domain_data = self.hass.data[DOMAIN]
+        if "site_cache" not in domain_data:
+            stored = await Store(self.hass, SITE_STORE_VERSION, SITE_STORE_KEY).async_load()
+            fetched_at = dt_util.parse_datetime(stored["fetched_at"]) if stored else None
+            domain_data["site_cache"] = (
+                {"sites": [Site.from_raw(raw) for raw in stored["sites"]], "fetched_at": fetched_at}
+                if fetched_at
+                else None
+            )
+        return domain_data["site_cache"]
+
+    async def _async_store_site_cache(self, raw_sites, fetched_at):
+        """Keep only the site fields we use, in memory and on disk.
+
+        raw_sites is None when the server reported the list unchanged.
+        """
+        if raw_sites is None:
+            sites = self.hass.data[DOMAIN]["site_cache"]["sites"]
+        else:
+            sites = await self.hass.async_add_executor_job(_parse_sites, raw_sites)
+        site_cache = {"sites": sites, "fetched_at": fetched_at}
+        self.hass.data[DOMAIN]["site_cache"] = site_cache
+        await Store(self.hass, SITE_STORE_VERSION, SITE_STORE_KEY).async_save(
+            {"sites": [site.as_raw() for site in sites], "fetched_at": fetched_at.isoformat()}
+        )
+        return site_cache
+
+    async def _fetch_records(self, session, url, headers, key, fields, conditional=True):
+        """GET one endpoint with its own timeout and retry budget, streaming out the records under key.
+
+        Records are parsed chunk by chunk as the body downloads, in the executor so the
+        event loop only moves bytes, and trimmed to fields. Repeat requests are
+        conditional unless the caller holds nothing to fall back on (conditional=False);
+        returns None when the server answers 304.
+        """
+        endpoint = url.split("?", 1)[0].rsplit("/", 1)[-1]
+        stats = self.endpoint_stats.setdefault(
+            endpoint,
+            {"requests": 0, "successes": 0, "failures": 0, "not_modified": 0, "retries": 0, "bytes": 0},
+        )
+        headers = dict(headers)
+        validator = self._validators.get(endpoint)
+        if conditional and validator and validator[0] == url:
+            if validator[1]:
+                headers["If-None-Match"] = validator[1]
+            if validator[2]:
+                headers["If-Modified-Since"] = validator[2]
+        attempt = 0
+
+        while True:
+            attempt += 1
+            stats["requests"] += 1
+            started = time.monotonic()
+            received = 0
+            try:
+                async with asyncio.timeout(REQUEST_TIMEOUT):
+                    async with session.get(url, headers=headers) as response:
+                        stats["last_status"] = response.status
+                        if response.status == 304:
+                            records = None
+                        elif response.status != 200:
+                            _LOGGER.error("QLD Fuel API returned status %s for %s", response.status, endpoint)
+                            if response.status < 500 and response.status != 429:
+                                stats["failures"] += 1
+                                stats["last_error"] = f"HTTP {response.status}"
+                                raise UpdateFailed(f"API Error {response.status}")
+                            raise aiohttp.ClientResponseError(
+                                response.request_info, response.history, status=response.status
+                            )
+                        else:
+                            chunks = queue.SimpleQueue()
+                            parser = self.hass.async_add_executor_job(
+                                _parse_chunks, chunks, RecordStream(key, fields)
+                            )
+                            try:
+                                async for chunk in response.content.iter_chunked(STREAM_CHUNK_SIZE):
+                                    received += len(chunk)
+                                    chunks.put(chunk)
+                            except BaseException:
+                                # Release the parser thread; its result no longer matters
+                                chunks.put(None)
+                                parser.cancel()
+                                raise
+                            chunks.put(b"")
+                            records, parsing = await parser
+                            self.metrics["parse_seconds"] += parsing
+                            self._validators[endpoint] = (
+                                url,
+                                response.headers.get("ETag"),
+                                response.headers.get("Last-Modified"),
+                            )
+            except (aiohttp.ClientError, TimeoutError, StreamError) as err:
+                stats["bytes"] += received
+                stats["last_error"] = str(err) or type(err).__name__
+                if attempt > REQUEST_RETRIES:
+                    stats["failures"] += 1
+                    raise UpdateFailed(f"{endpoint} failed after {attempt} attempts: {err}") from err
+                # Full jitter: sleep a random time up to an exponentially growing cap
+                delay = random.uniform(0, min(RETRY_BACKOFF_MAX, RETRY_BACKOFF_BASE * 2 ** (attempt - 1)))
+                stats["retries"] += 1
+                _LOGGER.debug("%s attempt %s failed (%s), retrying in %.1fs", endpoint, attempt, err, delay)
+                await asyncio.sleep(delay)
                 continue
 
-            display_price = float(price_raw) / 10.0
-            f_id = str(p.get("FuelId"))
-            s_id = str(p.get("SiteId"))
+            elapsed = time.monotonic() - started
+            stats["successes"] += 1
+            stats["bytes"] += received
+            self.metrics["bytes_fetched"] += received
+            stats["last_latency"] = round(elapsed, 3)
+            stats["last_success"] = dt_util.utcnow().isoformat()
+            if records is None:
+                stats["not_modified"] += 1
+                _LOGGER.debug("%s not modified (%.2fs, attempt %s)", endpoint, elapsed, attempt)
+                return None
 
-            clean_price_entry = {
-                "FuelId": f_id,
-                "Price": display_price,
-                "SiteId": s_id,
-            }
+            stats["last_records"] = len(records)
+            _LOGGER.debug(
+                "%s streamed %s records (%s bytes) in %.2fs (attempt %s)",
+                endpoint,
+                len(records),
+                received,
+                elapsed,
+                attempt,
+            )
+            return records
 
-            if f_id not in global_cheapest or display_price < global_cheapest[f_id]["price"]:
-                s_info = site_lookup.get(s_id, {})
-                global_cheapest[f_id] = {
-                    "price": display_price,
-                    "site_id": s_id,
-                    "name": s_info.get("N"),
-                    "address": s_info.get("A"),
-                    "postcode": s_info.get("P"),
-                }
 
-            price_map.setdefault(s_id, []).append(clean_price_entry)
+class QldFuelDataUpdateCoordinator(DataUpdateCoordinator):
+    """One zone: filters the shared snapshot to its radius whenever the fetcher updates."""
+
+    def __init__(self, hass, entry, fetcher):
+        self.entry = entry
+        self.fetcher = fetcher
 
-        return self._filter_to_zone(raw_sites, price_map, global_cheapest)
+        scan_interval = entry.options.get(
+            SCAN_INTERVAL, entry.data.get(SCAN_INTERVAL, 6)
+        )
+        self.scan_interval = timedelta(hours=float(scan_interval))
 
-    def _filter_to_zone(self, sites, price_map, global_cheapest):
+        # No timer of its own; refreshed by the fetcher's fan-out
+        super().__init__(
+            hass,
+            _LOGGER,
+            name=f"{DOMAIN}_{entry.title}",
+            update_interval=None,
+        )
+        self._snapshot_time = None
+        self._history_batch = None
+        # {(site, fuel): {days: (low, days_since_low, average)}} from the local history, else None
+        self.window_stats = None
+        self.changed_keys = set()
+        self.changed_fuels = {"global": set(), "local": set()}
+        # Stage timings and counters for this zone, shown by diagnostic sensors
+        self.metrics = {
+            "filter_seconds": None,
+            "sites_in_zone": None,
+            "snapshot_hits": 0,
+            "snapshot_misses": 0,
+            "entities_written": 0,
+            "window_hits": 0,
+            "window_misses": 0,
+            "history_seconds": None,
+        }
+
+    @callback
+    def async_update_listeners(self):
+        """Update the all-tracked aggregate before notifying this zone's entities."""
+        async_update_tracked_best(self.hass)
+        super().async_update_listeners()
+
+    async def _async_update_data(self):
+        """Filter the fetcher's current snapshot to this zone."""
+        snapshot = await self.fetcher.async_get_snapshot()
+
+        if (
+            self.data is not None
+            and self._snapshot_time == snapshot.fetched_at
+            and self.data["stale"] == snapshot.stale
+        ):
+            self.metrics["snapshot_hits"] += 1
+            self.changed_keys, self.changed_fuels = set(), {"global": set(), "local": set()}
+            return self.data
+
+        self.metrics["snapshot_misses"] += 1
+        zone_data, self.changed_keys, self.changed_fuels = await self._async_build_zone_data(snapshot)
+        await self._async_update_window_stats(zone_data["tracked"])
+        self._snapshot_time = snapshot.fetched_at
+        return zone_data
+
+    async def _async_build_zone_data(self, snapshot):
+        """Rebuild this zone from a snapshot in the executor, timing it."""
+        started = time.monotonic()
+        result = await self.hass.async_add_executor_job(self._build_zone_data, snapshot, self.data)
+        self.metrics["filter_seconds"] = round(time.monotonic() - started, 3)
+        self.metrics["sites_in_zone"] = len(result[0]["sites"])
+        return result
+
+    def _build_zone_data(self, snapshot, previous):
+        """Filter a snapshot to this zone and diff it against the previous zone data; runs in the executor."""
+        zone_data = self._filter_to_zone(snapshot, previous["tracked"] if previous else frozenset())
+        return (zone_data, *_diff_zone(previous, zone_data))
+
+    async def async_load_cached_snapshot(self):
+        """Seed this zone from the persisted snapshot so entities exist before the first fetch.
+
+        Returns False when nothing usable is on disk and a blocking first refresh is needed.
+        """
+        if not await self.fetcher.async_load_cached_snapshot():
+            return False
+
+        snapshot = self.fetcher.data
+        zone_data, self.changed_keys, self.changed_fuels = await self._async_build_zone_data(snapshot)
+        await self._async_update_window_stats(zone_data["tracked"])
+        self.async_set_updated_data(zone_data)
+        self._snapshot_time = snapshot.fetched_at
+        return True
+
+    async def _async_update_window_stats(self, tracked):
+        """Read every tracked pair's windows from the local history in one executor job.
+
+        Leaves window_stats None when another source is selected or the database is
+        unavailable, so sensors use the rolling windows below instead.
+        """
+        self.window_stats = None
+        if get_domain_option(self.hass, HISTORY_SOURCE, HISTORY_SOURCE_LOCAL) != HISTORY_SOURCE_LOCAL:
+            return
+        history_db = await self.fetcher.async_get_history_db()
+        if history_db is None:
+            return
+
+        started = time.monotonic()
+        try:
+            self.window_stats = await self.hass.async_add_executor_job(
+                history_db.pair_stats, tracked, dt_util.utcnow().timestamp()
+            )
+        except sqlite3.Error as err:
+            _LOGGER.warning("Could not read local price history: %s", err)
+            return
+        self.metrics["history_seconds"] = round(time.monotonic() - started, 3)
+
+    async def async_get_price_history(self, site_id, fuel_id, entity_id, price):
+        """Return the rolling 7/14 day windows for a (site, fuel), recording the current price if it changed.
+
+        Windows are shared by every zone and persisted; the recorder (states or
+        long-term statistics) is only read when a pair has no usable window yet.
+        """
+        windows = await self._async_get_price_windows()
+        key = f"{site_id}_{fuel_id}"
+        now = dt_util.utcnow().timestamp()
+
+        price_history = windows.get(key)
+        changed = price_history is None or price_history.is_empty()
+        if changed:
+            self.metrics["window_misses"] += 1
+            price_history = PriceHistory(await self.async_get_history(entity_id))
+            windows[key] = price_history
+        else:
+            self.metrics["window_hits"] += 1
+
+        if price is not None and self._snapshot_time is not None:
+            changed = price_history.record(self._snapshot_time.timestamp(), price) or changed
+        changed = price_history.expire(now) or changed
+
+        if changed:
+            self._window_store().async_delay_save(
+                lambda: {k: h.as_list() for k, h in windows.items() if not h.is_empty()},
+                WINDOW_STORE_SAVE_DELAY,
+            )
+        return price_history
+
+    async def _async_get_price_windows(self):
+        """Return the shared rolling windows, loading them from disk on first use."""
+        domain_data = self.hass.data[DOMAIN]
+        if "price_windows" not in domain_data:
+            stored = await self._window_store().async_load() or {}
+            windows = {}
+            for key, points in stored.items():
+                try:
+                    windows[key] = PriceHistory(tuple(p) for p in points)
+                except (TypeError, ValueError):
+                    _LOGGER.debug("Discarding invalid stored window for %s", key)
+            domain_data.setdefault("price_windows", windows)
+        return domain_data["price_windows"]
+
+    def _window_store(self):
+        """Return the shared Store holding the rolling windows."""
+        return self.hass.data[DOMAIN].setdefault(
+            "window_store", Store(self.hass, WINDOW_STORE_VERSION, WINDOW_STORE_KEY)
+        )
+
+    async def async_get_history(self, entity_id):
+        """Return 14 days of (ts, low, mean) points for one entity, batched with the rest of this zone.
+
+        Sensors asking within the same refresh share a single recorder query.
+        """
+        if self._history_batch is None:
+            self._history_batch = {"entity_ids": set(), "future": self.hass.loop.create_future()}
+            self.hass.async_create_task(self._async_run_history_batch())
+
+        batch = self._history_batch
+        batch["entity_ids"].add(entity_id)
+        history_points = await batch["future"]
+        return history_points.get(entity_id, [])
+
+    async def _async_run_history_batch(self):
+        """Run one recorder query covering every entity queued in the current batch."""
+        await asyncio.sleep(HISTORY_BATCH_DELAY)
+        batch, self._history_batch = self._history_batch, None
+        start_time = dt_util.utcnow() - timedelta(days=max(WINDOW_DAYS))
+        entity_ids = sorted(batch["entity_ids"])
+        source = get_domain_option(self.hass, HISTORY_SOURCE, HISTORY_SOURCE_LOCAL)
+        started = time.monotonic()
+
+        try:
+            history_points = await _async_recorder_points(self.hass, entity_ids, start_time)
+        except Exception as err:
+            batch["future"].set_exception(err)
+            return
+
+        self.metrics["history_seconds"] = round(time.monotonic() - started, 3)
+        _LOGGER.debug(
+            "Loaded %s history for %s entities in %s in %.2fs",
+            source,
+            len(entity_ids),
+            self.entry.title,
+            self.metrics["history_seconds"],
+        )
+        batch["future"].set_result(history_points)
+
+    def _filter_to_zone(self, snapshot, previous_tracked=frozenset()):
         """Filter stations within this entry's defined radius."""
         filtered_sites = {}
         local_cheapest = {}
@@ -132,48 +1058,34 @@ class QldFuelDataUpdateCoordinator(DataUpdateCoordinator):
         lon = self.entry.options.get(CONF_LONGITUDE, self.entry.data.get(CONF_LONGITUDE, self.hass.config.longitude))
         radius = float(self.entry.options.get(RADIUS, self.entry.data.get(RADIUS, 5)))
 
-        for site in sites:
-            s_id = str(site.get("S"))
-            try:
-                s_lat, s_lon = float(site["Lat"]), float(site["Lng"])
-            except (KeyError, TypeError, ValueError):
-                continue
+        columns = snapshot.get_columns() if radius >= numpy_engine.MIN_RADIUS_KM else None
+        if columns is not None:
+            positions, distances, cheapest = numpy_engine.zone_query(columns, lat, lon, radius)
+            for pos, dist in zip(positions.tolist(), distances.tolist()):
+                site = columns.sites[pos]
+                filtered_sites[site.site_id] = ZoneSite(site, round(dist, 1), snapshot.prices[site.site_id])
+            for f_id, (price, pos) in cheapest.items():
+                local_cheapest[f_id] = best_station(price, columns.site_ids[pos], columns.sites[pos])
+        else:
+            for site, dist in snapshot.site_index.query(lat, lon, radius):
+                site_prices = snapshot.prices.get(site.site_id)
+                if not site_prices:
+                    continue
 
-            dist = distance(lat, lon, s_lat, s_lon) / 1000
-            if dist > radius:
-                continue
+                for f_id, price in site_prices.items():
+                    if f_id not in local_cheapest or price < local_cheapest[f_id]["price"]:
+                        local_cheapest[f_id] = best_station(price, site.site_id, site)
+
+                filtered_sites[site.site_id] = ZoneSite(site, round(dist, 1), site_prices)
 
-            site_prices = price_map.get(s_id, [])
-            stats = {}
-
-            for p in site_prices:
-                f_id = str(p["FuelId"])
-                price = p["Price"]
-
-                stats[f_id] = {
-                    "qld_delta": round(price - global_cheapest.get(f_id, {}).get("price", price), 1)
-                }
-
-                if f_id not in local_cheapest or price < local_cheapest[f_id]["price"]:
-                    local_cheapest[f_id] = {
-                        "price": price,
-                        "site_id": s_id,
-                        "name": site.get("N"),
-                        "address": site.get("A"),
-                        "postcode": site.get("P"),
-                    }
-
-            filtered_sites[s_id] = {
-                "name": site.get("N"),
-                "address": site.get("A"),
-                "postcode": site.get("P"),
-                "distance": round(dist, 1),
-                "prices": site_prices,
-                "stats": stats,
-            }
+        fuels = set(self.entry.options.get(FUEL_TYPES, self.entry.data.get(FUEL_TYPES, [])))
+        limit = int(self.entry.options.get(MAX_STATIONS, DEFAULT_MAX_STATIONS))
+        order = self.entry.options.get(STATION_ORDER)
 
         return {
+            "stale": snapshot.stale,
             "sites": filtered_sites,
-            "global_cheapest": global_cheapest,
+            "tracked": _select_tracked(filtered_sites, fuels, limit, order, previous_tracked),
+            "global_cheapest": snapshot.global_cheapest,
             "local_cheapest": local_cheapest,
-        }
\ No newline at end of file
+        }
@@ -0,0 +1,101 @@
+import heapq
+import math
+import xml.etree.ElementTree as ET
+
+from .spatial import CELL_SIZE, KM_PER_DEG_LAT, _cell
+
+
+def _km_per_deg_lon(lat):
+    return KM_PER_DEG_LAT * max(math.cos(math.radians(lat)), 0.01)
+
+
+def load_gpx(path):
+    """Read track, route or waypoint coordinates from a GPX file, in file order."""
+    points = []
+    for element in ET.parse(path).iter():
+        if element.tag.rsplit("}", 1)[-1] in ("trkpt", "rtept", "wpt"):
+            points.append((float(element.get("lat")), float(element.get("lon"))))
+    return points
+
+
+class Corridor:
+    """A polyline with a buffer, bucketed by the SiteIndex grid for cheap site lookups.
+
+    Long segments are split to at most one grid cell so each one only claims the
+    cells it actually passes near; a site is then checked against the few
+    segments in its own cell instead of the whole route.
+    """
+
+    def __init__(self, points, buffer_km):
+        self.buffer_km = buffer_km
+        self.points = self._densify(points)
+        self.offsets = [0.0]
+        self.buckets = {}
+
+        d_lat = buffer_km / KM_PER_DEG_LAT
+        for i, ((lat1, lon1), (lat2, lon2)) in enumerate(zip(self.points, self.points[1:])):
+            self.offsets.append(self.offsets[-1] + self._segment_km(lat1, lon1, lat2, lon2))
+            d_lon = buffer_km / _km_per_deg_lon(max(abs(lat1), abs(lat2)))
+            min_cell = _cell(min(lat1, lat2) - d_lat, min(lon1, lon2) - d_lon)
+            max_cell = _cell(max(lat1, lat2) + d_lat, max(lon1, lon2) + d_lon)
+            for c_lat in range(min_cell[0], max_cell[0] + 1):
+                for c_lon in range(min_cell[1], max_cell[1] + 1):
+                    self.buckets.setdefault((c_lat, c_lon), []).append(i)
+
+    @property
+    def length_km(self):
+        return self.offsets[-1]
+
+    @staticmethod
+    def _densify(points):
+        """Insert points so no segment spans more than one grid cell in either direction."""
+        dense = [points[0]]
+        for lat2, lon2 in points[1:]:
+            lat1, lon1 = dense[-1]
+            steps = max(1, math.ceil(max(abs(lat2 - lat1), abs(lon2 - lon1)) / CELL_SIZE))
+            for step in range(1, steps + 1):
+                t = step / steps
+                dense.append((lat1 + (lat2 - lat1) * t, lon1 + (lon2 - lon1) * t))
+        return dense
+
+    @staticmethod
+    def _segment_km(lat1, lon1, lat2, lon2):
+        scale = _km_per_deg_lon((lat1 + lat2) / 2)
+        return math.hypot((lat2 - lat1) * KM_PER_DEG_LAT, (lon2 - lon1) * scale)
+
+    def _locate(self, i, lat, lon):
+        """Distance (km) from a point to segment i and how far along the route its closest point is."""
+        lat1, lon1 = self.points[i]
+        lat2, lon2 = self.points[i + 1]
+        # Local flat projection around the segment start; segments are at most ~11 km
+        scale = _km_per_deg_lon(lat1)
+        sx, sy = (lon2 - lon1) * scale, (lat2 - lat1) * KM_PER_DEG_LAT
+        px, py = (lon - lon1) * scale, (lat - lat1) * KM_PER_DEG_LAT
+        length_sq = sx * sx + sy * sy
+        t = 0.0 if length_sq == 0 else max(0.0, min(1.0, (px * sx + py * sy) / length_sq))
+        off = math.hypot(px - t * sx, py - t * sy)
+        return off, self.offsets[i] + t * (self.offsets[i + 1] - self.offsets[i])
+
+    def query(self, site_index):
+        """Return (site, off_route_km, route_km) for every indexed site within the buffer."""
+        results = []
+        for cell, segments in self.buckets.items():
+            for s_lat, s_lon, site in site_index.entries_in_cell(cell):
+                off, along = min(self._locate(i, s_lat, s_lon) for i in segments)
+                if off <= self.buffer_km:
+                    results.append((site, off, along))
+        return results
+
+
+def cheapest_along_route(snapshot, points, buffer_km, fuel_id, limit, distance_weight=0):
+    """Rank stations selling fuel_id within buffer_km of a route by price plus distance_weight per km off it.
+
+    Returns (route length km, [(score, price, off_route_km, route_km, site)]).
+    """
+    corridor = Corridor(points, buffer_km)
+    candidates = []
+    for site, off, along in corridor.query(snapshot.site_index):
+        price = snapshot.prices.get(site.site_id, {}).get(fuel_id)
+        if price is not None:
+            candidates.append((price + distance_weight * off, price, off, along, site))
+    return corridor.length_km, heapq.nsmallest(limit, candidates, key=lambda c: (c[0], c[3]))
@@ -0,0 +1,40 @@
+from homeassistant.components.diagnostics import async_redact_data
+
+from .const import DOMAIN, TOKEN
+
+TO_REDACT = {TOKEN}
+
+
+async def async_get_config_entry_diagnostics(hass, entry):
+    """Return diagnostics for a config entry, including the shared fetcher's health."""
+    coordinator = hass.data[DOMAIN][entry.entry_id]
+    fetcher = coordinator.fetcher
+    snapshot = fetcher.data
+    zone_data = coordinator.data or {}
+
+    return {
+        "entry": {
+            "title": entry.title,
+            "data": async_redact_data(dict(entry.data), TO_REDACT),
+            "options": async_redact_data(dict(entry.options), TO_REDACT),
+        },
+        "fetch": {
+            "last_update_success": fetcher.last_update_success,
+            "last_exception": str(fetcher.last_exception) if fetcher.last_exception else None,
+            "update_interval": str(fetcher.update_interval),
+            "circuit_breaker": fetcher.breaker.as_dict(),
+            "endpoints": fetcher.endpoint_stats,
+            "metrics": fetcher.metrics,
+        },
+        "snapshot": {
+            "fetched_at": snapshot.fetched_at.isoformat(),
+            "stale": snapshot.stale,
+            "sites": len(snapshot.sites),
+            "priced_sites": len(snapshot.prices),
+        } if snapshot else None,
+        "zone": {
+            "metrics": coordinator.metrics,
+            "sites": len(zone_data.get("sites", {})),
+            "local_cheapest": zone_data.get("local_cheapest", {}),
+        },
+    }
@@ -0,0 +1,209 @@
+import os
+import sqlite3
+import statistics
+import threading
+
+# Windows served from the local database; rows older than the longest one are pruned
+LOCAL_WINDOW_DAYS = (7, 14, 30, 90)
+RETENTION_DAYS = max(LOCAL_WINDOW_DAYS)
+
+_DAY = 86400
+
+# Prices are stored as integer tenths of a cent, as the API sends them
+_SCALE = 10
+
+_SCHEMA = (
+    # One row per price change; a NULL price marks a pair that left the feed
+    """CREATE TABLE IF NOT EXISTS prices (
+        site_id INTEGER NOT NULL,
+        fuel_id INTEGER NOT NULL,
+        ts INTEGER NOT NULL,
+        price INTEGER,
+        PRIMARY KEY (site_id, fuel_id, ts)
+    ) WITHOUT ROWID""",
+    # Covering index for statewide per-fuel queries
+    "CREATE INDEX IF NOT EXISTS prices_fuel_ts ON prices (fuel_id, ts, site_id, price)",
+)
+
+
+def _window_stats(rows, start, now):
+    """Return (low, days_since_low, average) over [start, now] from (ts, price) change rows.
+
+    The first row may predate the window; that price was still in effect at its
+    start. The average is time-weighted, and the low counts from the last moment
+    it was in effect, so a price still at its low is 0 days since low.
+    """
+    low = low_end = None
+    weighted = duration = 0
+    for i, (ts, price) in enumerate(rows):
+        end = rows[i + 1][0] if i + 1 < len(rows) else now
+        if price is None or end < start:
+            continue
+        begin = max(ts, start)
+        if low is None or price <= low:
+            low, low_end = price, end
+        weighted += price * (end - begin)
+        duration += end - begin
+
+    if low is None:
+        return None
+    average = weighted / duration if duration else low
+    return low / _SCALE, int((now - low_end) // _DAY), round(average / _SCALE, 1)
+
+
+def percentile_rank(values, value):
+    """Share of values (0-100) strictly below value."""
+    if not values:
+        return None
+    return round(100 * sum(1 for v in values if v < value) / len(values), 1)
+
+
+def percentiles(values, points=(10, 25, 50, 75, 90)):
+    """Return {"p10": .., ...} cut points of values, or {} with fewer than two values."""
+    if len(values) < 2:
+        return {}
+    cuts = statistics.quantiles(values, n=100, method="inclusive")
+    return {f"p{p}": round(cuts[p - 1], 1) for p in points}
+
+
+class PriceHistoryDb:
+    """Append-only (site, fuel, ts, price) history in a small SQLite file.
+
+    Only changes are written, once per fetch for the whole state, so a pair whose
+    price holds for a week costs one row. Methods block and run in the executor;
+    a lock serialises them because executor threads share one connection.
+    """
+
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            for statement in _SCHEMA:
+                self._conn.execute(statement)
+            # Last recorded price per pair, to tell which prices changed
+            self._last = {
+                (str(s_id), str(f_id)): price
+                for s_id, f_id, price, _ in self._conn.execute(
+                    "SELECT site_id, fuel_id, price, MAX(ts) FROM prices GROUP BY site_id, fuel_id"
+                )
+            }
+        self._pruned_at = None
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def is_empty(self):
+        return not self._last
+
+    def recorded_since(self):
+        """Timestamp of the oldest row, or None when nothing is recorded."""
+        with self._lock:
+            return self._conn.execute("SELECT MIN(ts) FROM prices").fetchone()[0]
+
+    def import_points(self, points_by_pair):
+        """Seed from existing {(site_id, fuel_id): [(ts, price), ...]} samples, keeping only changes."""
+        rows = []
+        with self._lock, self._conn:
+            for (s_id, f_id), points in points_by_pair.items():
+                last = None
+                for ts, price in sorted(points):
+                    price = round(price * _SCALE)
+                    if price != last:
+                        rows.append((s_id, f_id, int(ts), price))
+                        last = price
+                if last is not None:
+                    self._last[(s_id, f_id)] = last
+            self._conn.executemany("INSERT OR REPLACE INTO prices VALUES (?, ?, ?, ?)", rows)
+        return len(rows)
+
+    def record(self, ts, prices):
+        """Append the prices of one fetch ({site_id: {fuel_id: ¢/L}}) that differ from the last recorded ones."""
+        ts = int(ts)
+        rows = []
+        seen = set()
+        for s_id, site_prices in prices.items():
+            for f_id, price in site_prices.items():
+                key = (s_id, f_id)
+                seen.add(key)
+                price = round(price * _SCALE)
+                if self._last.get(key) != price:
+                    rows.append((s_id, f_id, ts, price))
+        rows.extend(
+            (s_id, f_id, ts, None)
+            for (s_id, f_id), price in self._last.items()
+            if price is not None and (s_id, f_id) not in seen
+        )
+
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT OR REPLACE INTO prices VALUES (?, ?, ?, ?)", rows)
+            if self._pruned_at is None or ts - self._pruned_at >= _DAY:
+                self._prune(ts - RETENTION_DAYS * _DAY)
+                self._pruned_at = ts
+        for s_id, f_id, _, price in rows:
+            self._last[(s_id, f_id)] = price
+        return len(rows)
+
+    def _prune(self, cutoff):
+        """Drop rows older than cutoff, except the one still in effect at cutoff."""
+        self._conn.execute(
+            """DELETE FROM prices WHERE ts < :cutoff AND EXISTS (
+                SELECT 1 FROM prices AS newer
+                WHERE newer.site_id = prices.site_id AND newer.fuel_id = prices.fuel_id
+                AND newer.ts > prices.ts AND newer.ts <= :cutoff
+            )""",
+            {"cutoff": cutoff},
+        )
+
+    def pair_stats(self, pairs, now, days_list=LOCAL_WINDOW_DAYS):
+        """Return {(site_id, fuel_id): {days: (low, days_since_low, average)}} for each pair with history."""
+        now = int(now)
+        start = now - max(days_list) * _DAY
+        results = {}
+        with self._lock:
+            for s_id, f_id in pairs:
+                rows = self._conn.execute(
+                    """SELECT ts, price FROM prices
+                    WHERE site_id = :site AND fuel_id = :fuel AND ts >= (
+                        SELECT COALESCE(MAX(ts), 0) FROM prices
+                        WHERE site_id = :site AND fuel_id = :fuel AND ts <= :start
+                    )
+                    ORDER BY ts""",
+                    {"site": s_id, "fuel": f_id, "start": start},
+                ).fetchall()
+                windows = {}
+                for days in days_list:
+                    stats = _window_stats(rows, now - days * _DAY, now)
+                    if stats is not None:
+                        windows[days] = stats
+                if windows:
+                    results[(s_id, f_id)] = windows
+        return results
+
+    def fuel_stats(self, fuel_id, days, now):
+        """Return {site_id: (low, days_since_low, average)} over the last days for every site selling fuel_id."""
+        now = int(now)
+        start = now - days * _DAY
+        with self._lock:
+            carried = self._conn.execute(
+                """SELECT site_id, MAX(ts), price FROM prices
+                WHERE fuel_id = ? AND ts <= ? GROUP BY site_id""",
+                (fuel_id, start),
+            ).fetchall()
+            recent = self._conn.execute(
+                "SELECT site_id, ts, price FROM prices WHERE fuel_id = ? AND ts > ?",
+                (fuel_id, start),
+            ).fetchall()
+
+        by_site = {}
+        for s_id, ts, price in carried + recent:
+            by_site.setdefault(str(s_id), []).append((ts, price))
+
+        results = {}
+        for s_id, rows in by_site.items():
+            rows.sort()
+            stats = _window_stats(rows, start, now)
+            if stats is not None:
+                results[s_id] = stats
+        return results
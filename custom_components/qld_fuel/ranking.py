@@ -0,0 +1,67 @@
+import heapq
+import math
+
+from homeassistant.util.location import distance
+
+from .spatial import KM_PER_DEG_LAT
+
+
+class FuelIndex:
+    """Statewide prices for one fuel, sorted cheapest first, with site coordinates alongside."""
+
+    __slots__ = ("prices", "sites", "lat", "lng")
+
+    def __init__(self, entries):
+        entries = sorted(entries, key=lambda entry: entry[0])
+        self.prices = [entry[0] for entry in entries]
+        self.sites = [entry[1] for entry in entries]
+        self.lat = [entry[1].lat for entry in entries]
+        self.lng = [entry[1].lng for entry in entries]
+
+
+def build_fuel_indexes(site_lookup, prices):
+    """Build a FuelIndex per fuel from {site_id: {fuel_id: price}}; sites without coordinates are left out."""
+    by_fuel = {}
+    for s_id, site_prices in prices.items():
+        site = site_lookup.get(s_id)
+        if site is None or site.lat is None:
+            continue
+        for f_id, price in site_prices.items():
+            by_fuel.setdefault(f_id, []).append((price, site))
+    return {f_id: FuelIndex(entries) for f_id, entries in by_fuel.items()}
+
+
+def query_cheapest(index, lat, lon, radius_km, limit, distance_weight=0):
+    """Return up to limit (score, price, distance_km, site) within radius_km, best score first.
+
+    Score is price plus distance_weight cents per km. Walking the index in price
+    order lets the scan stop as soon as the next price alone cannot beat the
+    current limit-th best score.
+    """
+    lat, lon = float(lat), float(lon)
+    d_lat = radius_km / KM_PER_DEG_LAT
+    d_lon = radius_km / (KM_PER_DEG_LAT * max(math.cos(math.radians(lat)), 0.01))
+    min_lat, max_lat, min_lon, max_lon = lat - d_lat, lat + d_lat, lon - d_lon, lon + d_lon
+
+    # Max-heap (negated) of the best `limit` results so far
+    best = []
+    for i, price in enumerate(index.prices):
+        if len(best) == limit and price >= -best[0][0]:
+            break
+        s_lat, s_lon = index.lat[i], index.lng[i]
+        if not (min_lat <= s_lat <= max_lat and min_lon <= s_lon <= max_lon):
+            continue
+        dist = distance(lat, lon, s_lat, s_lon) / 1000
+        if dist > radius_km:
+            continue
+        score = price + distance_weight * dist
+        item = (-score, -i, price, dist)
+        if len(best) < limit:
+            heapq.heappush(best, item)
+        elif item > best[0]:
+            heapq.heapreplace(best, item)
+
+    return [
+        (-neg_score, price, dist, index.sites[-neg_i])
+        for neg_score, neg_i, price, dist in sorted(best, reverse=True)
+    ]
@@ -0,0 +1,102 @@
+from collections import deque
+from datetime import timedelta
+
+# Weight of a full hour of new observation in each hour-of-day average
+SMOOTHING = 0.3
+
+
+class AdaptiveScheduler:
+    """Pick the next statewide fetch interval from observed price-change rates.
+
+    Tracks a smoothed count of changed prices per hour for each hour of the day
+    (QLD price cycles are predictable), spreads the daily request budget in
+    proportion to it without sleeping through the start of a busier hour, and
+    never exceeds the budget over any rolling 24 hours.
+    The budget counts HTTP requests, so retries and site-detail downloads use it
+    up too; fetches are spaced by the smoothed number of requests each one costs.
+    """
+
+    def __init__(self, daily_budget, min_interval, max_interval, hourly_rates=None):
+        self.daily_budget = max(int(daily_budget), 1)
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.hourly_rates = list(hourly_rates) if hourly_rates else [None] * 24
+        # (time, HTTP requests made) over the last 24 hours
+        self._requests = deque()
+        self.requests_per_fetch = 1.0
+        self._last_fetch = None
+        # When the next fetch is due, or None while adaptive polling is off
+        self.next_fetch = None
+
+    def record_requests(self, now, count):
+        """Charge HTTP requests to the rolling budget, including those of failed fetches."""
+        if count:
+            self._requests.append((now, count))
+
+    def record_fetch(self, now, changed_count, requests=1):
+        """Record a completed fetch, how many prices it changed and how many requests it took.
+
+        now is local time. The changes could have happened anywhere since the last
+        fetch, so every hour of day the gap covered learns its rate, weighted by how
+        much of that hour it covered.
+        """
+        self.record_requests(now, requests)
+        self.requests_per_fetch += SMOOTHING * (max(requests, 1) - self.requests_per_fetch)
+        last, self._last_fetch = self._last_fetch, now
+        # Longer gaps (e.g. a suspended host) say nothing about any particular hour
+        if last is None or not timedelta(0) < now - last <= timedelta(days=1):
+            return
+
+        rate = changed_count / ((now - last).total_seconds() / 3600)
+        start = last
+        while start < now:
+            end = min(start.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1), now)
+            weight = SMOOTHING * (end - start).total_seconds() / 3600
+            previous = self.hourly_rates[start.hour]
+            self.hourly_rates[start.hour] = rate if previous is None else previous + weight * (rate - previous)
+            start = end
+
+    def next_interval(self, now):
+        """Return how long to wait before the next fetch; now is local time."""
+        while self._requests and now - self._requests[0][0] > timedelta(days=1):
+            self._requests.popleft()
+        fetch_budget = self.daily_budget / self.requests_per_fetch
+
+        interval = self._hour_interval(now.hour, fetch_budget)
+        # Wake up for the start of a busier hour instead of sleeping through it
+        boundary = now.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+        while boundary < now + interval:
+            if self._hour_interval(boundary.hour, fetch_budget) < interval:
+                interval = max(boundary - now, self.min_interval)
+                break
+            boundary += timedelta(hours=1)
+
+        excess = sum(count for _, count in self._requests) + self.requests_per_fetch - self.daily_budget
+        if excess > 0:
+            # Budget spent: wait until enough requests age out of the window to afford another fetch
+            for requested_at, count in self._requests:
+                excess -= count
+                if excess <= 0:
+                    interval = max(interval, requested_at + timedelta(days=1) - now)
+                    break
+
+        return interval
+
+    def _hour_interval(self, hour, fetch_budget):
+        """The fetch interval an hour of day gets from its share of the budget."""
+        known = [r for r in self.hourly_rates if r is not None]
+        total = sum(known)
+        if total > 0:
+            # An average hour gets budget/24 fetches, busier hours proportionally more;
+            # hours not observed yet are treated as average
+            mean = total / len(known)
+            rate = self.hourly_rates[hour]
+            if rate is None:
+                rate = mean
+            fetches_per_hour = fetch_budget / 24 * rate / mean
+            interval = (
+                timedelta(hours=1 / fetches_per_hour) if fetches_per_hour > 0 else self.max_interval
+            )
+        else:
+            interval = timedelta(days=1) / fetch_budget
+        return max(self.min_interval, min(self.max_interval, interval))
@@ -1,20 +1,56 @@
-from datetime import timedelta
 import logging
 
-from homeassistant.components.recorder import history, get_instance
-from homeassistant.components.sensor import SensorEntity, SensorStateClass
-from homeassistant.const import CONF_LATITUDE, CONF_LONGITUDE
+from homeassistant.components.sensor import SensorDeviceClass, SensorEntity, SensorStateClass
+from homeassistant.const import CONF_LATITUDE, CONF_LONGITUDE, EntityCategory, UnitOfInformation, UnitOfTime
 from homeassistant.core import callback
+from homeassistant.helpers import entity_registry as er
 from homeassistant.helpers.device_registry import DeviceEntryType, DeviceInfo
+from homeassistant.helpers.dispatcher import async_dispatcher_connect
 from homeassistant.helpers.update_coordinator import CoordinatorEntity
 from homeassistant.util import dt as dt_util
 from homeassistant.util.location import distance
 
-from .const import DOMAIN, FUEL_TYPES, FUEL_TYPES_OPTIONS
+from .const import DOMAIN, FUEL_TYPES, FUEL_TYPES_OPTIONS, SIGNAL_TRACKED_BEST_UPDATED
+from .stats import WINDOW_DAYS
 
 _LOGGER = logging.getLogger(__name__)
 
-_RESERVED_DOMAIN_KEYS = {"raw_data", "last_fetch_time", "fetch_lock", "master_entry_id"}
+_RESERVED_DOMAIN_KEYS = {
+    "fetcher",
+    "site_cache",
+    "price_store",
+    "price_rows",
+    "prices_since",
+    "last_full_sync",
+    "price_windows",
+    "window_store",
+    "tracked_best",
+    "master_entry_id",
+    "scheduler",
+    "scheduler_store",
+    "history_db",
+}
+
+
+# (metrics key, name, unit, device class, state class) for the refresh pipeline diagnostics
+FETCH_DIAGNOSTICS = (
+    ("fetch_seconds", "Fetch Duration", UnitOfTime.SECONDS, SensorDeviceClass.DURATION, SensorStateClass.MEASUREMENT),
+    ("parse_seconds", "Parse Duration", UnitOfTime.SECONDS, SensorDeviceClass.DURATION, SensorStateClass.MEASUREMENT),
+    ("merge_seconds", "Price Merge Duration", UnitOfTime.SECONDS, SensorDeviceClass.DURATION, SensorStateClass.MEASUREMENT),
+    ("snapshot_seconds", "Snapshot Build Duration", UnitOfTime.SECONDS, SensorDeviceClass.DURATION, SensorStateClass.MEASUREMENT),
+    ("price_rows", "Price Rows Processed", None, None, SensorStateClass.MEASUREMENT),
+    ("bytes_fetched", "Data Downloaded", UnitOfInformation.BYTES, SensorDeviceClass.DATA_SIZE, SensorStateClass.TOTAL_INCREASING),
+)
+ZONE_DIAGNOSTICS = (
+    ("filter_seconds", "Zone Filter Duration", UnitOfTime.SECONDS, SensorDeviceClass.DURATION, SensorStateClass.MEASUREMENT),
+    ("history_seconds", "History Query Duration", UnitOfTime.SECONDS, SensorDeviceClass.DURATION, SensorStateClass.MEASUREMENT),
+    ("sites_in_zone", "Sites in Zone", None, None, SensorStateClass.MEASUREMENT),
+    ("entities_written", "Entity State Writes", None, None, SensorStateClass.TOTAL_INCREASING),
+    ("snapshot_hits", "Snapshot Cache Hits", None, None, SensorStateClass.TOTAL_INCREASING),
+    ("snapshot_misses", "Snapshot Cache Misses", None, None, SensorStateClass.TOTAL_INCREASING),
+    ("window_hits", "Price Window Cache Hits", None, None, SensorStateClass.TOTAL_INCREASING),
+    ("window_misses", "Price Window Cache Misses", None, None, SensorStateClass.TOTAL_INCREASING),
+)
 
 
 def get_fuel_data(data_dict, f_id):
@@ -24,23 +60,6 @@ def get_fuel_data(data_dict, f_id):
     return data_dict.get(str(f_id))
 
 
-def _find_all_tracked_best(hass, fuel_id):
-    """Return the cheapest local price and its station data across all tracked zones."""
-    best_price = None
-    best_station = None
-    for key, coord in hass.data.get(DOMAIN, {}).items():
-        if key in _RESERVED_DOMAIN_KEYS:
-            continue
-        if hasattr(coord, "data") and coord.data:
-            local_best = get_fuel_data(coord.data.get("local_cheapest"), fuel_id)
-            if local_best and local_best.get("price") is not None:
-                price = float(local_best["price"])
-                if best_price is None or price < best_price:
-                    best_price = price
-                    best_station = local_best
-    return best_price, best_station
-
-
 async def async_setup_entry(hass, entry, async_add_entities):
     """Set up the fuel sensors for this specific entry."""
     domain_data = hass.data[DOMAIN]
@@ -53,16 +72,6 @@ async def async_setup_entry(hass, entry, async_add_entities):
     )
     chosen_fuels = entry.options.get(FUEL_TYPES, entry.data.get(FUEL_TYPES, []))
 
-    sites_data = coordinator.data.get("sites", {})
-
-    for site_id, site_data in sites_data.items():
-        if not site_data.get("prices"):
-            continue
-        for price_info in site_data["prices"]:
-            f_id = str(price_info.get("FuelId"))
-            if f_id in chosen_fuels:
-                entities.append(FuelPriceSensor(coordinator, site_id, f_id))
-
     if is_master:
         for f_id in chosen_fuels:
             entities.append(QldFuelBestPriceSensor(coordinator, f_id, "global"))
@@ -71,8 +80,70 @@ async def async_setup_entry(hass, entry, async_add_entities):
     for f_id in chosen_fuels:
         entities.append(QldFuelBestPriceSensor(coordinator, f_id, "local"))
 
+    if is_master:
+        entities.extend(
+            QldFuelDiagnosticSensor(coordinator.fetcher, None, *description) for description in FETCH_DIAGNOSTICS
+        )
+    entities.extend(
+        QldFuelDiagnosticSensor(coordinator, entry, *description) for description in ZONE_DIAGNOSTICS
+    )
+
     async_add_entities(entities)
 
+    station_sensors = {}
+    fuels = set(chosen_fuels)
+
+    def _zone_pairs():
+        """Every (site, fuel) pair in the zone for the chosen fuels, whether or not a cap tracks it."""
+        sites = coordinator.data.get("sites", {}) if coordinator.data else {}
+        return {(s_id, f_id) for s_id, zone_site in sites.items() for f_id in zone_site.prices if f_id in fuels}
+
+    # Station sensors left in the registry from earlier runs: keep those still in the zone
+    # (unavailable while a cap leaves them out) and drop the rest (closed stations, moved zone)
+    registry = er.async_get(hass)
+    prefix = f"{DOMAIN}_{entry.entry_id}_"
+    zone_pairs = _zone_pairs()
+    for registry_entry in er.async_entries_for_config_entry(registry, entry.entry_id):
+        unique_id = registry_entry.unique_id
+        if not unique_id.startswith(prefix) or "_diagnostic_" in unique_id:
+            continue
+        f_id, _, s_id = unique_id[len(prefix):].partition("_")
+        if (s_id, f_id) in zone_pairs:
+            station_sensors[(s_id, f_id)] = FuelPriceSensor(coordinator, s_id, f_id)
+        else:
+            registry.async_remove(registry_entry.entity_id)
+    if station_sensors:
+        async_add_entities(station_sensors.values())
+
+    @callback
+    def _async_reconcile_stations():
+        """Add sensors for newly tracked (site, fuel) pairs and retire ones that left the zone.
+
+        Pairs a station cap drops keep their entity (unavailable) so names, areas and
+        dashboard references survive the cheapest set moving between price cycles.
+        """
+        if coordinator.data is None:
+            return
+        tracked = coordinator.data.get("tracked", set())
+        registry = er.async_get(hass)
+
+        for key in station_sensors.keys() - _zone_pairs():
+            sensor = station_sensors.pop(key)
+            # Dropping the registry entry removes the entity instead of leaving it unavailable
+            if sensor.entity_id and registry.async_get(sensor.entity_id):
+                registry.async_remove(sensor.entity_id)
+            else:
+                hass.async_create_task(sensor.async_remove())
+
+        new_sensors = {key: FuelPriceSensor(coordinator, *key) for key in tracked - station_sensors.keys()}
+        if new_sensors:
+            _LOGGER.debug("Adding %s station sensors to %s", len(new_sensors), entry.title)
+            station_sensors.update(new_sensors)
+            async_add_entities(new_sensors.values())
+
+    _async_reconcile_stations()
+    entry.async_on_unload(coordinator.async_add_listener(_async_reconcile_stations))
+
 
 class QldFuelBestPriceSensor(CoordinatorEntity, SensorEntity):
     """Sensor for reporting best prices (Global, Local, or All Tracked)."""
@@ -101,6 +172,42 @@ class QldFuelBestPriceSensor(CoordinatorEntity, SensorEntity):
             self._attr_unique_id = f"{DOMAIN}_local_{coordinator.entry.entry_id}_{fuel_id}"
 
         self._attr_icon = "mdi:star-circle"
+        self._written_available = None
+        self._written_stale = None
+
+    async def async_added_to_hass(self):
+        await super().async_added_to_hass()
+        if self.scope == "all_tracked":
+            self.async_on_remove(
+                async_dispatcher_connect(
+                    self.hass, SIGNAL_TRACKED_BEST_UPDATED, self._handle_tracked_best_update
+                )
+            )
+
+    @callback
+    def _handle_coordinator_update(self) -> None:
+        # All-tracked sensors follow the domain aggregate; the master zone only moves availability and staleness
+        if self.scope == "all_tracked":
+            if self.available != self._written_available or self._stale() != self._written_stale:
+                self.async_write_ha_state()
+            return
+        if self.fuel_id in self.coordinator.changed_fuels[self.scope] or self.available != self._written_available:
+            self.async_write_ha_state()
+
+    @callback
+    def _handle_tracked_best_update(self, changed_fuels) -> None:
+        if self.fuel_id in changed_fuels:
+            self.async_write_ha_state()
+
+    @callback
+    def async_write_ha_state(self) -> None:
+        self._written_available = self.available
+        self._written_stale = self._stale()
+        self.coordinator.metrics["entities_written"] += 1
+        super().async_write_ha_state()
+
+    def _stale(self):
+        return self.coordinator.data.get("stale", False) if self.coordinator.data else None
 
     @property
     def device_info(self) -> DeviceInfo:
@@ -128,8 +235,8 @@ class QldFuelBestPriceSensor(CoordinatorEntity, SensorEntity):
             return data.get("price") if data else None
 
         if self.scope == "all_tracked":
-            best_price, _ = _find_all_tracked_best(self.hass, self.fuel_id)
-            return best_price
+            data = get_fuel_data(self.hass.data[DOMAIN].get("tracked_best"), self.fuel_id)
+            return data.get("price") if data else None
 
         data = get_fuel_data(self.coordinator.data.get("local_cheapest"), self.fuel_id)
         return data.get("price") if data else None
@@ -141,7 +248,7 @@ class QldFuelBestPriceSensor(CoordinatorEntity, SensorEntity):
         elif self.scope == "local":
             station_data = get_fuel_data(self.coordinator.data.get("local_cheapest"), self.fuel_id)
         else:
-            _, station_data = _find_all_tracked_best(self.hass, self.fuel_id)
+            station_data = get_fuel_data(self.hass.data[DOMAIN].get("tracked_best"), self.fuel_id)
 
         if not station_data:
             return {"status": f"No data for fuel_id {self.fuel_id} in {self.scope}"}
@@ -150,26 +257,26 @@ class QldFuelBestPriceSensor(CoordinatorEntity, SensorEntity):
         if site_id is None:
             return {"status": "Price found but site_id is missing"}
 
-        raw_data = self.hass.data.get(DOMAIN, {}).get("raw_data", {})
-        all_sites = raw_data.get("sites", [])
-        site_raw = next((s for s in all_sites if str(s.get("S")) == str(site_id)), None)
+        snapshot = self.coordinator.fetcher.data
+        site = snapshot.sites.get(str(site_id)) if snapshot else None
 
-        if not site_raw:
+        if not site:
             return {"status": f"Site {site_id} not found in raw data"}
 
         h_lat = self.coordinator.entry.options.get(CONF_LATITUDE, self.coordinator.entry.data.get(CONF_LATITUDE))
         h_lon = self.coordinator.entry.options.get(CONF_LONGITUDE, self.coordinator.entry.data.get(CONF_LONGITUDE))
-        s_lat = float(site_raw.get("Lat", 0))
-        s_lon = float(site_raw.get("Lng", 0))
+        s_lat = site.lat or 0
+        s_lon = site.lng or 0
 
         dist_km = "N/A"
         if h_lat and h_lon and s_lat != 0:
             dist_km = round(distance(h_lat, h_lon, s_lat, s_lon) / 1000, 1)
 
         return {
-            "station_name": site_raw.get("N", "Unknown"),
-            "address": f"{site_raw.get('A', '')} {site_raw.get('P', '')}".strip(),
+            "station_name": site.name or "Unknown",
+            "address": f"{site.address or ''} {site.postcode or ''}".strip(),
             "distance_km": dist_km,
+            "data_stale": self.coordinator.data.get("stale", False),
         }
 
 
@@ -185,16 +292,13 @@ class FuelPriceSensor(CoordinatorEntity, SensorEntity):
         self.fuel_id = fuel_id
         self._attr_icon = "mdi:gas-station"
 
-        self._14d_low = None
-        self._14d_low_days = None
-        self._14d_avg = None
-        self._7d_low = None
-        self._7d_low_days = None
-        self._7d_avg = None
+        # days -> (low, days_since_low, average)
+        self._windows = {}
+        self._written_available = None
 
         fuel_info = next((f for f in FUEL_TYPES_OPTIONS if f["value"] == fuel_id), {"label": fuel_id})
-        site = coordinator.data.get("sites", {}).get(site_id)
-        site_name = site["name"] if site else "Unknown"
+        zone_site = coordinator.data.get("sites", {}).get(site_id)
+        site_name = zone_site.site.name if zone_site else "Unknown"
 
         self._attr_name = f"{site_name} {fuel_info['label']}"
         self._attr_unique_id = f"{DOMAIN}_{coordinator.entry.entry_id}_{fuel_id}_{site_id}"
@@ -209,92 +313,132 @@ class FuelPriceSensor(CoordinatorEntity, SensorEntity):
             entry_type=DeviceEntryType.SERVICE,
         )
 
+    @property
+    def available(self):
+        """Unavailable while a station cap leaves this pair out, rather than deleting the entity."""
+        return super().available and (self.site_id, self.fuel_id) in self.coordinator.data.get("tracked", ())
+
     @property
     def native_value(self):
-        site_data = self.coordinator.data.get("sites", {}).get(self.site_id, {})
-        for p in site_data.get("prices", []):
-            if str(p.get("FuelId")) == self.fuel_id:
-                return p.get("Price")
-        return None
+        zone_site = self.coordinator.data.get("sites", {}).get(self.site_id)
+        return zone_site.prices.get(self.fuel_id) if zone_site else None
 
     @property
     def extra_state_attributes(self):
-        site = self.coordinator.data.get("sites", {}).get(self.site_id, {})
-        stats = site.get("stats", {}).get(self.fuel_id, {})
+        zone_site = self.coordinator.data.get("sites", {}).get(self.site_id)
+        site = zone_site.site if zone_site else None
+        price = zone_site.prices.get(self.fuel_id) if zone_site else None
+        global_best = get_fuel_data(self.coordinator.data.get("global_cheapest"), self.fuel_id)
+        qld_delta = round(price - global_best["price"], 1) if price is not None and global_best else 0
 
         attrs = {
-            "address": f"{site.get('address')} {site.get('postcode')}".strip(),
-            "distance": f"{site.get('distance')} km",
+            "address": f"{site.address if site else None} {site.postcode if site else None}".strip(),
+            "distance": f"{zone_site.distance if zone_site else None} km",
             "fuel_id": self.fuel_id,
-            "difference_to_qld_cheapest": stats.get("qld_delta", 0),
+            "difference_to_qld_cheapest": qld_delta,
+            "data_stale": self.coordinator.data.get("stale", False),
         }
 
-        if self._7d_low is not None:
+        for days, (low, low_days, avg) in sorted(self._windows.items()):
             attrs.update({
-                "7_day_low": f"{self._7d_low} ¢/L",
-                "7_day_average": f"{self._7d_avg} ¢/L",
-                "days_since_7_day_low": f"{self._7d_low_days} days",
-            })
-        if self._14d_low is not None:
-            attrs.update({
-                "14_day_low": f"{self._14d_low} ¢/L",
-                "14_day_average": f"{self._14d_avg} ¢/L",
-                "days_since_14_day_low": f"{self._14d_low_days} days",
+                f"{days}_day_low": f"{low} ¢/L",
+                f"{days}_day_average": f"{avg} ¢/L",
+                f"days_since_{days}_day_low": f"{low_days} days",
             })
         return attrs
 
     async def async_added_to_hass(self):
         await super().async_added_to_hass()
-        await self._update_history()
+        await self._update_history(force_write=True)
 
     @callback
     def _handle_coordinator_update(self) -> None:
-        self.hass.async_create_task(self._update_history())
-        super()._handle_coordinator_update()
+        force_write = (
+            (self.site_id, self.fuel_id) in self.coordinator.changed_keys
+            or self.available != self._written_available
+        )
+        self.hass.async_create_task(self._update_history(force_write))
 
-    async def _update_history(self):
-        """Query the recorder for historical lows and averages."""
+    @callback
+    def async_write_ha_state(self) -> None:
+        self._written_available = self.available
+        self.coordinator.metrics["entities_written"] += 1
+        super().async_write_ha_state()
+
+    async def _update_history(self, force_write=False):
+        """Refresh the windowed lows and averages, writing state only if something changed.
+
+        Windows come from the zone's local history read when available, else from
+        the rolling 7/14 day windows.
+        """
         if self.hass.is_stopping:
             return
 
-        now = dt_util.utcnow()
-        start_time = now - timedelta(days=14)
+        previous = dict(self._windows)
 
-        try:
-            state_history = await get_instance(self.hass).async_add_executor_job(
-                history.get_significant_states, self.hass, start_time, None, [self.entity_id]
-            )
-        except (AttributeError, ValueError) as err:
-            _LOGGER.debug("Could not retrieve history for %s: %s", self.entity_id, err)
+        if self.coordinator.window_stats is not None:
+            windows = self.coordinator.window_stats.get((self.site_id, self.fuel_id), {})
+        else:
+            try:
+                price_history = await self.coordinator.async_get_price_history(
+                    self.site_id, self.fuel_id, self.entity_id, self.native_value
+                )
+            except (AttributeError, ValueError) as err:
+                _LOGGER.debug("Could not retrieve history for %s: %s", self.entity_id, err)
+                self.async_write_ha_state()
+                return
+
+            now = dt_util.utcnow().timestamp()
+            windows = {days: price_history.stats(days, now) for days in WINDOW_DAYS}
+
+        self._windows.update((days, stats) for days, stats in windows.items() if stats)
+
+        if force_write or self._windows != previous:
             self.async_write_ha_state()
-            return
 
-        if self.entity_id in state_history:
-            valid_points = []
-            for s in state_history[self.entity_id]:
-                if s.state in ("unknown", "unavailable", "", None):
-                    continue
-                try:
-                    valid_points.append((float(s.state), s.last_changed))
-                except ValueError:
-                    continue
-
-            if valid_points:
-                min_price = min(p[0] for p in valid_points)
-                min_time = max(p[1] for p in valid_points if p[0] == min_price)
-
-                self._14d_low = min_price
-                self._14d_low_days = (now - min_time).days
-                self._14d_avg = round(sum(p[0] for p in valid_points) / len(valid_points), 1)
-
-                seven_days_ago = now - timedelta(days=7)
-                recent_points = [p for p in valid_points if p[1] > seven_days_ago]
-
-                if recent_points:
-                    min_7d = min(p[0] for p in recent_points)
-                    min_7d_time = max(p[1] for p in recent_points if p[0] == min_7d)
-                    self._7d_low = min_7d
-                    self._7d_low_days = (now - min_7d_time).days
-                    self._7d_avg = round(sum(p[0] for p in recent_points) / len(recent_points), 1)
-
-        self.async_write_ha_state()
+
+class QldFuelDiagnosticSensor(CoordinatorEntity, SensorEntity):
+    """Refresh pipeline timing or counter, read from a coordinator's metrics.
+
+    Statewide fetch metrics (entry is None) follow the shared fetcher; zone metrics follow the zone.
+    """
+
+    _attr_entity_category = EntityCategory.DIAGNOSTIC
+
+    def __init__(self, coordinator, entry, key, name, unit, device_class, state_class):
+        super().__init__(coordinator)
+        self.key = key
+        self.entry = entry
+        self._attr_name = name
+        self._attr_native_unit_of_measurement = unit
+        self._attr_device_class = device_class
+        self._attr_state_class = state_class
+        self._attr_icon = "mdi:timer-outline" if device_class == SensorDeviceClass.DURATION else "mdi:counter"
+
+        if entry is None:
+            self._attr_unique_id = f"{DOMAIN}_diagnostic_{key}"
+        else:
+            self._attr_unique_id = f"{DOMAIN}_{entry.entry_id}_diagnostic_{key}"
+
+    @property
+    def device_info(self) -> DeviceInfo:
+        if self.entry is None:
+            return DeviceInfo(
+                identifiers={(DOMAIN, "qld_statewide_global")},
+                name="Queensland Fuel Prices",
+                manufacturer="QLD Government",
+                model="Statewide Monitor",
+                entry_type=DeviceEntryType.SERVICE,
+            )
+
+        return DeviceInfo(
+            identifiers={(DOMAIN, f"zone_{self.entry.entry_id}")},
+            name=self.entry.title,
+            manufacturer="QLD Fuel API",
+            model="Local Zone Monitor",
+            entry_type=DeviceEntryType.SERVICE,
+        )
+
+    @property
+    def native_value(self):
+        return self.coordinator.metrics.get(self.key)
@@ -0,0 +1,136 @@
+import sys
+import threading
+
+from . import numpy_engine
+from .ranking import build_fuel_indexes
+from .spatial import SiteIndex
+
+
+class Site:
+    """Station metadata, shared read-only by every zone."""
+
+    __slots__ = ("site_id", "name", "address", "postcode", "lat", "lng")
+
+    def __init__(self, site_id, name, address, postcode, lat, lng):
+        self.site_id = site_id
+        self.name = name
+        self.address = address
+        self.postcode = postcode
+        self.lat = lat
+        self.lng = lng
+
+    @classmethod
+    def from_raw(cls, raw):
+        """Build from a GetFullSiteDetails record (or its cached subset)."""
+        try:
+            lat, lng = float(raw["Lat"]), float(raw["Lng"])
+        except (KeyError, TypeError, ValueError):
+            lat = lng = None
+        return cls(sys.intern(str(raw["S"])), raw.get("N"), raw.get("A"), raw.get("P"), lat, lng)
+
+    def as_raw(self):
+        return {"S": self.site_id, "N": self.name, "A": self.address, "P": self.postcode, "Lat": self.lat, "Lng": self.lng}
+
+
+class ZoneSite:
+    """A station inside one zone; prices are the snapshot's dict, not a copy."""
+
+    __slots__ = ("site", "distance", "prices")
+
+    def __init__(self, site, distance, prices):
+        self.site = site
+        self.distance = distance
+        self.prices = prices
+
+
+class Snapshot:
+    """Pre-processed statewide data built once per fetch and shared by every zone."""
+
+    __slots__ = (
+        "fetched_at",
+        "stale",
+        "sites",
+        "site_index",
+        "prices",
+        "global_cheapest",
+        "columns",
+        "fuel_indexes",
+        "_columns_lock",
+    )
+
+    def __init__(self, fetched_at, stale, sites, site_index, prices, global_cheapest, columns=None, fuel_indexes=None):
+        self.fetched_at = fetched_at
+        self.stale = stale
+        self.sites = sites
+        self.site_index = site_index
+        self.prices = prices
+        self.global_cheapest = global_cheapest
+        # numpy_engine.PriceColumns once a large zone has needed them (see get_columns)
+        self.columns = columns
+        # {fuel_id: ranking.FuelIndex} for ad-hoc cheapest-near-a-point queries
+        self.fuel_indexes = fuel_indexes or {}
+        self._columns_lock = threading.Lock()
+
+    def get_columns(self):
+        """Columnar prices for vectorised zone scans, built on first use; None without NumPy.
+
+        Zones filter in executor threads, so the first build is locked.
+        """
+        if self.columns is None and numpy_engine.HAS_NUMPY:
+            with self._columns_lock:
+                if self.columns is None:
+                    self.columns = numpy_engine.build_columns(self.sites, self.prices)
+        return self.columns
+
+
+def build_snapshot(sites, price_rows, fetched_at, stale=False):
+    """Pre-process cached sites and {(site_id, fuel_id): raw_price} rows once so every zone can share them."""
+    site_lookup = {site.site_id: site for site in sites}
+    prices = {}
+
+    for (s_id, f_id), price_raw in price_rows.items():
+        if price_raw is None or not (1 < price_raw < 9990):
+            continue
+        prices.setdefault(s_id, {})[f_id] = float(price_raw) / 10.0
+
+    site_index = SiteIndex(
+        (site.lat, site.lng, site) for site in site_lookup.values() if site.lat is not None
+    )
+
+    cheapest = {}
+    for s_id, site_prices in prices.items():
+        for f_id, price in site_prices.items():
+            if f_id not in cheapest or price < cheapest[f_id][0]:
+                cheapest[f_id] = (price, s_id)
+
+    global_cheapest = {
+        f_id: best_station(price, s_id, site_lookup.get(s_id))
+        for f_id, (price, s_id) in cheapest.items()
+    }
+
+    return Snapshot(
+        fetched_at,
+        stale,
+        site_lookup,
+        site_index,
+        prices,
+        global_cheapest,
+        None,
+        build_fuel_indexes(site_lookup, prices),
+    )
+
+
+def best_station(price, site_id, site):
+    """Best-price entry as published in global/local/tracked cheapest maps."""
+    return {
+        "price": price,
+        "site_id": site_id,
+        "name": site.name if site else None,
+        "address": site.address if site else None,
+        "postcode": site.postcode if site else None,
+    }
+
+
+def price_key(site_id, fuel_id):
+    """Interned (site_id, fuel_id) key used for price rows."""
+    return sys.intern(str(site_id)), sys.intern(str(fuel_id))
@@ -0,0 +1,53 @@
+import math
+
+from homeassistant.util.location import distance
+
+# Grid cell size in degrees (~11 km of latitude). Small enough that a 5 km zone
+# touches a handful of cells, large enough that a 100 km zone stays cheap.
+CELL_SIZE = 0.1
+
+KM_PER_DEG_LAT = 111.32
+
+
+def _cell(lat, lon):
+    return (math.floor(lat / CELL_SIZE), math.floor(lon / CELL_SIZE))
+
+
+class SiteIndex:
+    """Grid-bucketed spatial index over the statewide site list."""
+
+    def __init__(self, entries):
+        """Index (lat, lon, site) entries."""
+        self._cells = {}
+        self.size = 0
+
+        for s_lat, s_lon, site in entries:
+            self._cells.setdefault(_cell(s_lat, s_lon), []).append((s_lat, s_lon, site))
+            self.size += 1
+
+    def entries_in_cell(self, cell):
+        """Return the (lat, lon, site) entries bucketed in one grid cell."""
+        return self._cells.get(cell, ())
+
+    def query(self, lat, lon, radius_km):
+        """Return (site, distance_km) for every site within radius_km of a point."""
+        lat, lon = float(lat), float(lon)
+        d_lat = radius_km / KM_PER_DEG_LAT
+        d_lon = radius_km / (KM_PER_DEG_LAT * max(math.cos(math.radians(lat)), 0.01))
+
+        min_lat, max_lat = lat - d_lat, lat + d_lat
+        min_lon, max_lon = lon - d_lon, lon + d_lon
+        min_cell = _cell(min_lat, min_lon)
+        max_cell = _cell(max_lat, max_lon)
+
+        results = []
+        for c_lat in range(min_cell[0], max_cell[0] + 1):
+            for c_lon in range(min_cell[1], max_cell[1] + 1):
+                for s_lat, s_lon, site in self._cells.get((c_lat, c_lon), ()):
+                    if not (min_lat <= s_lat <= max_lat and min_lon <= s_lon <= max_lon):
+                        continue
+                    dist = distance(lat, lon, s_lat, s_lon) / 1000
+                    if dist <= radius_km:
+                        results.append((site, dist))
+
+        return results
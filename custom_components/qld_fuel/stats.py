@@ -0,0 +1,160 @@
+from collections import deque
+
+WINDOW_DAYS = (7, 14)
+
+_DAY = 86400
+
+# Running sums are kept in integer thousandths of a cent so they never drift
+_SCALE = 1000
+
+
+class PriceWindow:
+    """Rolling low and time-weighted average over a fixed number of days.
+
+    Points are (timestamp, low, mean) price changes, each in effect until the next.
+    The first point may predate the window since its price still held at the start.
+    The low is tracked with a monotonic deque and the average with running sums over
+    the closed segments after the first, so adding and expiring points is amortised O(1).
+    """
+
+    __slots__ = ("days", "_points", "_mins", "_sum", "_duration")
+
+    def __init__(self, days):
+        self.days = days
+        self._points = deque()
+        # [ts, low, end] where end is when that low stopped being in effect (None while current)
+        self._mins = deque()
+        self._sum = 0
+        self._duration = 0
+
+    def add(self, ts, low, mean):
+        ts = int(ts)
+        if len(self._points) >= 2:
+            prev_ts, _, prev_mean = self._points[-1]
+            self._sum += round(prev_mean * _SCALE) * (ts - prev_ts)
+            self._duration += ts - prev_ts
+        if self._mins:
+            self._mins[-1][2] = ts
+        self._points.append((ts, low, mean))
+        # Keep the latest of equal lows so "days since low" counts from the most recent one
+        while self._mins and self._mins[-1][1] >= low:
+            self._mins.pop()
+        self._mins.append([ts, low, None])
+
+    def expire(self, now):
+        """Drop points that stopped being in effect before the window; True if any were dropped."""
+        cutoff = now - self.days * _DAY
+        expired = False
+        while len(self._points) >= 2 and self._points[1][0] <= cutoff:
+            self._points.popleft()
+            expired = True
+            if len(self._points) >= 2:
+                # The new first segment is clipped to the window in stats() instead
+                ts, _, mean = self._points[0]
+                self._sum -= round(mean * _SCALE) * (self._points[1][0] - ts)
+                self._duration -= self._points[1][0] - ts
+        while self._mins and self._mins[0][0] < self._points[0][0]:
+            self._mins.popleft()
+        return expired
+
+    def stats(self, now):
+        """Return (low, days_since_low, average), or None when the window is empty."""
+        if not self._points:
+            return None
+        first_ts, _, first_mean = self._points[0]
+        first_end = self._points[1][0] if len(self._points) > 1 else now
+        first = max(first_end - max(first_ts, now - self.days * _DAY), 0)
+        weighted = self._sum + round(first_mean * _SCALE) * first
+        duration = self._duration + first
+        if len(self._points) > 1:
+            last_ts, _, last_mean = self._points[-1]
+            weighted += round(last_mean * _SCALE) * max(now - last_ts, 0)
+            duration += max(now - last_ts, 0)
+        average = weighted / duration / _SCALE if duration else self._points[-1][2]
+
+        _, low, low_end = self._mins[0]
+        days_since_low = int(max(now - (now if low_end is None else low_end), 0) // _DAY)
+        return low, days_since_low, round(average, 1)
+
+    def points(self):
+        return list(self._points)
+
+    def __len__(self):
+        return len(self._points)
+
+
+class PriceHistory:
+    """7 and 14 day windows for one (site, fuel) pair, fed with price changes only."""
+
+    __slots__ = ("windows", "last_ts", "_last")
+
+    def __init__(self, points=()):
+        self.windows = {days: PriceWindow(days) for days in WINDOW_DAYS}
+        self.last_ts = None
+        self._last = None
+        for ts, low, mean in sorted(points):
+            # Older stores sampled every fetch; repeats add nothing to a time-weighted window
+            if (low, mean) != self._last:
+                self._add(ts, low, mean)
+
+    def _add(self, ts, low, mean):
+        for window in self.windows.values():
+            window.add(ts, low, mean)
+        self.last_ts = ts
+        self._last = (low, mean)
+
+    def record(self, ts, price):
+        """Record the price of a fetch if it changed; True if a point was added.
+
+        Zones sharing the pair pass the same fetch time, so it is only recorded once.
+        """
+        if (self.last_ts is None or ts > self.last_ts) and (price, price) != self._last:
+            self._add(ts, price, price)
+            return True
+        return False
+
+    def expire(self, now):
+        expired = False
+        for window in self.windows.values():
+            expired = window.expire(now) or expired
+        return expired
+
+    def stats(self, days, now):
+        return self.windows[days].stats(now)
+
+    def is_empty(self):
+        return not len(self.windows[max(WINDOW_DAYS)])
+
+    def as_list(self):
+        return [list(p) for p in self.windows[max(WINDOW_DAYS)].points()]
+
+
+def points_from_states(states, start_ts):
+    """Turn recorder states into window points, skipping anything that is not a price.
+
+    The first state may predate the window; it is clamped to the window start
+    because that price was still in effect then.
+    """
+    points = []
+    for s in states:
+        if s.state in ("unknown", "unavailable", "", None):
+            continue
+        try:
+            price = float(s.state)
+        except ValueError:
+            continue
+        points.append((max(s.last_changed.timestamp(), start_ts), price, price))
+    return points
+
+
+def points_from_statistics(rows):
+    """Turn hourly long-term statistics rows into window points."""
+    points = []
+    for row in rows:
+        if row.get("min") is None or row.get("mean") is None:
+            continue
+        start = row["start"]
+        # Older HA versions return datetimes, newer ones epoch floats
+        ts = start.timestamp() if hasattr(start, "timestamp") else float(start)
+        points.append((ts, float(row["min"]), float(row["mean"])))
+    return points
@@ -0,0 +1,133 @@
+import codecs
+import json
+
+_WHITESPACE = " \t\n\r"
+
+# What may follow a value inside an object or array
+_DELIMITERS = ",}]"
+
+_decoder = json.JSONDecoder()
+
+
+class StreamError(ValueError):
+    """The payload was not the JSON shape we expected."""
+
+
+class RecordStream:
+    """Incrementally pull the records of one top-level array out of a JSON object.
+
+    Feed it the body chunk by chunk as it downloads; each record is decoded as
+    soon as its bytes are complete and trimmed to the wanted fields, so neither
+    the full body nor the full object tree is ever held in memory.
+    """
+
+    def __init__(self, key, fields):
+        self.key = key
+        self.fields = fields
+        self.records = []
+        self._text = codecs.getincrementaldecoder("utf-8")()
+        self._buf = ""
+        self._pos = 0
+        # start -> key -> colon -> value | items -> done
+        self._state = "start"
+        self._current_key = None
+
+    def feed(self, chunk):
+        self._buf = self._buf[self._pos:] + self._text.decode(chunk)
+        self._pos = 0
+        while self._step():
+            pass
+
+    def close(self):
+        """Finish the stream and return the records; raise if the body was cut short."""
+        self.feed(b"")
+        if self._state != "done":
+            raise StreamError(f"Truncated payload while reading {self.key!r}")
+        return self.records
+
+    def _skip_ws(self):
+        buf, pos = self._buf, self._pos
+        while pos < len(buf) and buf[pos] in _WHITESPACE:
+            pos += 1
+        self._pos = pos
+        return pos < len(buf)
+
+    def _decode(self):
+        """Decode one JSON value at the cursor, or return (False, None) if it is incomplete."""
+        try:
+            value, end = _decoder.raw_decode(self._buf, self._pos)
+        except json.JSONDecodeError:
+            return False, None
+        # A number or literal is only complete once a delimiter follows it; until then the
+        # next chunk may continue it ("1" + ".5")
+        if not isinstance(value, (dict, list, str)):
+            after = end
+            while after < len(self._buf) and self._buf[after] in _WHITESPACE:
+                after += 1
+            if after == len(self._buf) or self._buf[after] not in _DELIMITERS:
+                return False, None
+        self._pos = end
+        return True, value
+
+    def _step(self):
+        if not self._skip_ws():
+            return False
+        char = self._buf[self._pos]
+
+        if self._state == "start":
+            if char != "{":
+                raise StreamError("Expected a JSON object")
+            self._pos += 1
+            self._state = "key"
+            return True
+
+        if self._state == "key":
+            if char == ",":
+                self._pos += 1
+                return True
+            if char == "}":
+                self._pos += 1
+                self._state = "done"
+                return False
+            ok, key = self._decode()
+            if not ok:
+                return False
+            self._current_key = key
+            self._state = "colon"
+            return True
+
+        if self._state == "colon":
+            if char != ":":
+                raise StreamError("Expected ':' after object key")
+            self._pos += 1
+            self._state = "value"
+            return True
+
+        if self._state == "value":
+            if self._current_key == self.key and char == "[":
+                self._pos += 1
+                self._state = "items"
+                return True
+            # Other top-level values are small; decode and drop them
+            ok, _ = self._decode()
+            if not ok:
+                return False
+            self._state = "key"
+            return True
+
+        if self._state == "items":
+            if char == ",":
+                self._pos += 1
+                return True
+            if char == "]":
+                self._pos += 1
+                self._state = "key"
+                return True
+            ok, record = self._decode()
+            if not ok:
+                return False
+            if isinstance(record, dict):
+                self.records.append({field: record.get(field) for field in self.fields})
+            return True
+
+        return False
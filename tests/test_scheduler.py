@@ -0,0 +1,74 @@
+"""Adaptive polling: learning hourly change rates and spending the budget on busy hours."""
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from custom_components.qld_fuel.scheduler import AdaptiveScheduler
+
+BRISBANE = timezone(timedelta(hours=10))
+BUSY_HOURS = range(6, 10)
+BUSY_RATE = 120
+
+
+def _changes(start, end):
+    """Price changes between two times when only BUSY_HOURS see any, at BUSY_RATE an hour."""
+    minutes = 0
+    t = start
+    while t < end:
+        step = min(end, t.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1))
+        if t.hour in BUSY_HOURS:
+            minutes += (step - t).total_seconds() / 60
+        t = step
+    return round(BUSY_RATE * minutes / 60)
+
+
+def _run(scheduler, start, days):
+    now = start
+    fetches = []
+    while now < start + timedelta(days=days):
+        last = fetches[-1] if fetches else now - timedelta(minutes=15)
+        scheduler.record_fetch(now, _changes(last, now))
+        fetches.append(now)
+        now += scheduler.next_interval(now)
+    return fetches
+
+
+def test_quiet_hours_do_not_sleep_through_the_cycle():
+    scheduler = AdaptiveScheduler(96, timedelta(minutes=5), timedelta(hours=6))
+    start = datetime(2026, 3, 1, tzinfo=BRISBANE)
+    fetches = _run(scheduler, start, 7)
+
+    for day in range(2, 7):
+        day_start = start + timedelta(days=day)
+        busy = [t for t in fetches if day_start <= t < day_start + timedelta(days=1) and t.hour in BUSY_HOURS]
+        assert len(busy) >= 20
+        assert min(t.hour for t in busy) == BUSY_HOURS[0]
+
+
+def test_budget_holds_over_any_24_hours():
+    scheduler = AdaptiveScheduler(48, timedelta(minutes=1), timedelta(hours=6))
+    fetches = _run(scheduler, datetime(2026, 3, 1, tzinfo=BRISBANE), 5)
+
+    for i, t in enumerate(fetches):
+        window = [f for f in fetches[i:] if f - t < timedelta(days=1)]
+        assert len(window) <= 48 + 1
+
+
+def test_gap_rate_is_spread_over_the_hours_it_covered():
+    scheduler = AdaptiveScheduler(96, timedelta(minutes=5), timedelta(hours=6))
+    scheduler.record_fetch(datetime(2026, 3, 1, 4, 0, tzinfo=BRISBANE), 0)
+    scheduler.record_fetch(datetime(2026, 3, 1, 10, 0, tzinfo=BRISBANE), 60)
+
+    assert scheduler.hourly_rates[4:10] == [pytest.approx(10)] * 6
+    assert scheduler.hourly_rates[3] is None
+    assert scheduler.hourly_rates[10] is None
+
+
+def test_partial_hours_weigh_in_by_coverage():
+    scheduler = AdaptiveScheduler(96, timedelta(minutes=5), timedelta(hours=6), [100.0] * 24)
+    scheduler.record_fetch(datetime(2026, 3, 1, 4, 45, tzinfo=BRISBANE), 0)
+    scheduler.record_fetch(datetime(2026, 3, 1, 5, 15, tzinfo=BRISBANE), 0)
+
+    assert scheduler.hourly_rates[4] == pytest.approx(100 * (1 - 0.3 / 4))
+    assert scheduler.hourly_rates[5] == pytest.approx(100 * (1 - 0.3 / 4))
+    assert scheduler.hourly_rates[6] == 100.0
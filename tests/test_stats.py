@@ -0,0 +1,52 @@
+"""Rolling windows against the brute-force window statistics of the history database."""
+import random
+
+import pytest
+
+from custom_components.qld_fuel.history_db import _window_stats
+from custom_components.qld_fuel.stats import PriceHistory, PriceWindow
+
+_DAY = 86400
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_window_matches_time_weighted_stats(seed):
+    rng = random.Random(seed)
+    window = PriceWindow(7)
+    rows = []
+    ts = now = 1_700_000_000
+    for _ in range(rng.randint(1, 60)):
+        ts = max(ts, now) + rng.randint(600, 2 * _DAY) + 7
+        price = rng.randint(1500, 2100)
+        if rows and rows[-1][1] == price:
+            continue
+        rows.append((ts, price))
+        window.add(ts, price / 10, price / 10)
+        now = ts + rng.randint(0, _DAY)
+        window.expire(now)
+
+        expected = _window_stats(rows, now - 7 * _DAY, now)
+        assert window.stats(now) == pytest.approx(expected)
+
+
+def test_unchanged_prices_do_not_weight_the_average():
+    history = PriceHistory()
+    start = 1_700_000_000
+    history.record(start, 200.0)
+    # Polled every minute for an hour at 100, then a day at 200 polled once
+    for minute in range(1, 61):
+        history.record(start + _DAY + minute * 60, 100.0)
+    history.record(start + _DAY + 3600, 200.0)
+    now = start + 2 * _DAY + 3600
+
+    low, days_since_low, average = history.stats(7, now)
+    assert len(history.windows[7]) == 3
+    assert (low, days_since_low) == (100.0, 1)
+    assert average == pytest.approx((200 * _DAY + 100 * 3600 + 200 * _DAY) / (2 * _DAY + 3600), abs=0.05)
+
+
+def test_old_sampled_points_are_collapsed_to_changes():
+    history = PriceHistory([(1, 190.0, 190.0), (2, 190.0, 190.0), (3, 185.0, 185.0), (4, 185.0, 185.0)])
+    assert history.as_list() == [[1, 190.0, 190.0], [3, 185.0, 185.0]]
+    assert not history.record(5, 185.0)
+    assert history.record(6, 187.0)
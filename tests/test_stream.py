@@ -0,0 +1,37 @@
+"""Chunk-boundary tests for the incremental record parser."""
+import json
+import random
+
+import pytest
+
+from custom_components.qld_fuel.stream import RecordStream, StreamError
+
+
+def _parse(body, size, key="S", fields=("S", "x")):
+    stream = RecordStream(key, fields)
+    for i in range(0, len(body), size):
+        stream.feed(body[i:i + size])
+    return stream.close()
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 4, 5, 64])
+def test_float_split_across_chunks(size):
+    assert _parse(b'{"S":[{"S":1}],"n":1.5}', size) == [{"S": 1, "x": None}]
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64, 4096])
+def test_records_survive_any_chunk_size(size):
+    rng = random.Random(size)
+    records = [
+        {"S": i, "x": rng.uniform(-1e3, 1e3), "extra": [True, None, -1.5e-3, "é"]}
+        for i in range(50)
+    ]
+    body = json.dumps({"before": -12.75e2, "S": records, "after": False}, ensure_ascii=False).encode()
+
+    assert _parse(body, size) == [{"S": r["S"], "x": r["x"]} for r in records]
+
+
+@pytest.mark.parametrize("body", [b'{"S":[{"S":1},', b'{"S":[{"S":1}],"n":1.', b'{"S":[1 2]}'])
+def test_truncated_or_invalid_payload_raises(body):
+    with pytest.raises(StreamError):
+        _parse(body, 1)